@@ -0,0 +1,30 @@
+"""add notification threshold and due date
+
+Revision ID: 0c13696a1c43
+Revises: c8089ec37bd6
+Create Date: 2026-10-18 17:41:46.100777
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c13696a1c43'
+down_revision = 'c8089ec37bd6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('threshold_days', sa.Integer(), nullable=True))
+    op.add_column('notifications', sa.Column('due_date', sa.Date(), nullable=True))
+    op.create_index('ix_notifications_task_threshold', 'notifications',
+                    ['task_id', 'threshold_days', 'due_date'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_task_threshold', table_name='notifications')
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.drop_column('due_date')
+        batch_op.drop_column('threshold_days')
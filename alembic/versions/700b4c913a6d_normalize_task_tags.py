@@ -0,0 +1,87 @@
+"""normalize task tags
+
+Revision ID: 700b4c913a6d
+Revises: 0c13696a1c43
+Create Date: 2026-10-18 17:44:25.174397
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '700b4c913a6d'
+down_revision = '0c13696a1c43'
+branch_labels = None
+depends_on = None
+
+
+# The task search index reads tasks.tags, so it is dropped here and
+# recreated without the column by search.init_task_search on startup
+FTS_OBJECTS = [
+    'DROP TRIGGER IF EXISTS tasks_fts_insert',
+    'DROP TRIGGER IF EXISTS tasks_fts_delete',
+    'DROP TRIGGER IF EXISTS tasks_fts_update',
+    'DROP TABLE IF EXISTS tasks_fts',
+]
+
+
+def upgrade() -> None:
+    tags = op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    task_tag_association = op.create_table(
+        'task_tag_association',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id']),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id']),
+        sa.PrimaryKeyConstraint('task_id', 'tag_id'),
+    )
+    op.create_index('ix_task_tag_association_tag_task', 'task_tag_association', ['tag_id', 'task_id'])
+
+    # Split the existing comma-separated strings into tag rows
+    connection = op.get_bind()
+    tag_ids = {}
+    links = []
+    for task_id, tag_string in connection.execute(sa.text('SELECT id, tags FROM tasks')):
+        names = []
+        for name in (tag_string or '').split(','):
+            name = name.strip().lower()
+            if name and name not in names:
+                names.append(name)
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = connection.execute(tags.insert().values(name=name)).inserted_primary_key[0]
+            links.append({'task_id': task_id, 'tag_id': tag_ids[name]})
+    if links:
+        op.bulk_insert(task_tag_association, links)
+
+    for statement in FTS_OBJECTS:
+        op.execute(statement)
+
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('tags')
+
+
+def downgrade() -> None:
+    for statement in FTS_OBJECTS:
+        op.execute(statement)
+
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('tags', sa.String(), nullable=True))
+
+    op.execute(
+        "UPDATE tasks SET tags = ("
+        "SELECT group_concat(tags.name, ', ') FROM task_tag_association "
+        "JOIN tags ON tags.id = task_tag_association.tag_id "
+        "WHERE task_tag_association.task_id = tasks.id)"
+    )
+
+    op.drop_index('ix_task_tag_association_tag_task', table_name='task_tag_association')
+    op.drop_table('task_tag_association')
+    op.drop_table('tags')
@@ -0,0 +1,29 @@
+"""add task sort indexes
+
+Revision ID: 76c70881e285
+Revises: 700b4c913a6d
+Create Date: 2026-10-18 17:51:02.835494
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '76c70881e285'
+down_revision = '700b4c913a6d'
+branch_labels = None
+depends_on = None
+
+
+# Index per /show_tasks sort key; the id makes the keyset order unique
+SORT_COLUMNS = ['title', 'due_date', 'priority', 'created_at', 'status']
+
+
+def upgrade() -> None:
+    for column in SORT_COLUMNS:
+        op.create_index(f'ix_tasks_{column}_id', 'tasks', [column, 'id'])
+
+
+def downgrade() -> None:
+    for column in SORT_COLUMNS:
+        op.drop_index(f'ix_tasks_{column}_id', table_name='tasks')
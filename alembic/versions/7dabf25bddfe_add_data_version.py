@@ -0,0 +1,30 @@
+"""add data version
+
+Revision ID: 7dabf25bddfe
+Revises: 95fe9ebe739a
+Create Date: 2026-10-18 19:02:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7dabf25bddfe'
+down_revision = '95fe9ebe739a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The row itself is created by the first commit that changes data
+    op.create_table(
+        'data_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('data_version')
@@ -0,0 +1,49 @@
+"""index foreign keys and association tables
+
+Revision ID: 95fe9ebe739a
+Revises: dfd9668cf156
+Create Date: 2026-10-18 18:09:20.560576
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '95fe9ebe739a'
+down_revision = 'dfd9668cf156'
+branch_labels = None
+depends_on = None
+
+
+# Indexes for every foreign key and both directions of each association
+# table that has no primary key covering them
+INDEXES = [
+    ('ix_user_task_association_task_user', 'user_task_association', ['task_id', 'user_id']),
+    ('ix_task_notification_association_task_notification', 'task_notification_association', ['task_id', 'notification_id']),
+    ('ix_task_notification_association_notification_task', 'task_notification_association', ['notification_id', 'task_id']),
+    ('ix_user_notification_association_user_notification', 'user_notification_association', ['user_id', 'notification_id']),
+    ('ix_user_notification_association_notification_user', 'user_notification_association', ['notification_id', 'user_id']),
+    ('ix_project_task_association_task_project', 'project_task_association', ['task_id', 'project_id']),
+    ('ix_team_user_association_team_user', 'team_user_association', ['team_id', 'user_id']),
+    ('ix_team_user_association_user_team', 'team_user_association', ['user_id', 'team_id']),
+    ('ix_team_task_association_team_task', 'team_task_association', ['team_id', 'task_id']),
+    ('ix_team_task_association_task_team', 'team_task_association', ['task_id', 'team_id']),
+    ('ix_project_team_association_team_project', 'project_team_association', ['team_id', 'project_id']),
+    ('ix_user_info_user_id', 'user_info', ['user_id']),
+    ('ix_projects_user_id', 'projects', ['user_id']),
+    ('ix_tasks_created_by', 'tasks', ['created_by']),
+    ('ix_comments_task_id', 'comments', ['task_id']),
+    ('ix_attachments_task_id', 'attachments', ['task_id']),
+    ('ix_team_member_roles_user_id', 'team_member_roles', ['user_id']),
+    ('ix_team_member_roles_team_id', 'team_member_roles', ['team_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
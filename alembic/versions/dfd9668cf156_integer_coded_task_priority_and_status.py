@@ -0,0 +1,80 @@
+"""integer coded task priority and status
+
+Revision ID: dfd9668cf156
+Revises: 76c70881e285
+Create Date: 2026-10-18 18:03:35.995634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dfd9668cf156'
+down_revision = '76c70881e285'
+branch_labels = None
+depends_on = None
+
+
+# Codes as of this revision (models.TaskPriority / models.TaskStatus).
+# Values that match none of the labels become NULL.
+PRIORITY_CODES = {'low': 1, 'medium': 2, 'high': 3}
+STATUS_CODES = {
+    'Not Started': 1,
+    'In Progress': 2,
+    'Completed': 3,
+    'On Hold': 4,
+    'Cancelled': 5,
+    'Pending Review': 6,
+    'Blocked': 7,
+    'Deferred': 8,
+}
+
+# Rebuilding the tasks table drops the triggers on it, and the counter
+# triggers compare against the old string values. All of them are dropped
+# here and recreated by search.init_task_search and counters.init_counters
+# on startup, which also rebuild the index and the counters.
+TRIGGERS = [
+    'DROP TRIGGER IF EXISTS tasks_fts_insert',
+    'DROP TRIGGER IF EXISTS tasks_fts_delete',
+    'DROP TRIGGER IF EXISTS tasks_fts_update',
+    'DROP TABLE IF EXISTS tasks_fts',
+    'DROP TRIGGER IF EXISTS user_task_counters_insert',
+    'DROP TRIGGER IF EXISTS user_task_counters_delete',
+    'DROP TRIGGER IF EXISTS task_counters_update',
+    'DROP TRIGGER IF EXISTS task_counters_delete',
+]
+
+
+def _case(column, mapping):
+    whens = ' '.join(f"WHEN {key!r} THEN {value!r}" for key, value in mapping.items())
+    return f"CASE {column} {whens} ELSE NULL END"
+
+
+def upgrade() -> None:
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+    op.execute(
+        f"UPDATE tasks SET "
+        f"priority = {_case('lower(priority)', PRIORITY_CODES)}, "
+        f"status = {_case('status', STATUS_CODES)}"
+    )
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.alter_column('status', type_=sa.Integer(), existing_type=sa.String())
+        batch_op.create_index('ix_tasks_status_priority_due_date', ['status', 'priority', 'due_date'])
+
+
+def downgrade() -> None:
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_status_priority_due_date')
+        batch_op.alter_column('status', type_=sa.String(), existing_type=sa.Integer())
+
+    op.execute(
+        f"UPDATE tasks SET "
+        f"priority = {_case('priority', {code: name for name, code in PRIORITY_CODES.items()})}, "
+        f"status = {_case('CAST(status AS INTEGER)', {code: name for name, code in STATUS_CODES.items()})}"
+    )
@@ -1,79 +1,119 @@
 import re
 import os
 
-from datetime import datetime, timedelta
-from helper import calculate_user_task_priority
-from sqlalchemy.orm import joinedload,object_session
+import click
+
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import joinedload, selectinload, contains_eager
 from sqlalchemy.orm.exc import StaleDataError
 
-from flask import Flask, render_template, redirect, request, flash, jsonify, g, abort,send_from_directory
+from flask import Flask, render_template, redirect, request, flash, jsonify, abort,send_from_directory
 from flask_login import LoginManager, login_user, current_user, login_required, logout_user
-from flask_bcrypt import Bcrypt
 
 from models import *
-from database import init_database
+from database import init_database, remove_session, session
+import search
+from pagination import paginate, explain_sort
+from query_stats import init_query_budget, init_query_stats
+from metrics import init_metrics
+from notifications import start_notification_scheduler, notify_due_date_change
+from write_behind import start_write_behind
 import config
 
-import matplotlib
-matplotlib.use('agg')  # Use the "agg" backend
-import matplotlib.pyplot as plt
-
+import charts
+from performance import department_performance
+from assignments import assign_team_to_project, assign_team_to_tasks, team_assigned_to_project
+from teams import create_teams, UnknownMembers
+from counters import counter_drift, recompute_counters
+from user_cache import user_cache
+from http_cache import init_http_cache
+from passwords import init_passwords, hash_password, check_password, needs_rehash, PasswordHashingBusy
 
 import logging
+from app_logging import init_logging
 
-logger = logging.getLogger(__name__)
+# Send log records through a queue to a background writer, sampling the
+# per-request debug output (see app_logging.py)
+init_logging()
+logger = logging.getLogger('app')
 
 # Configure Flask
 app = Flask(__name__)
 app.secret_key = config.SECRET_KEY
 app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI
 app.config["TEMPLATES_AUTO_RELOAD"] = config.TEMPLATES_AUTO_RELOAD
+app.config['QUERY_BUDGET'] = config.QUERY_BUDGET
 app.use_static_for = True
 app.static_folder = 'static'
 
-app.add_url_rule('/charts/<path:filename>', endpoint='charts', view_func=app.send_static_file)
+# Task choices rendered by the task forms
+app.jinja_env.globals.update(TaskPriority=TaskPriority, TaskStatus=TaskStatus)
+
+# Rendered charts are written here and served by serve_chart
+CHART_DIRECTORY = os.path.join(app.static_folder, 'charts')
+
+
+# Build the engine and connection pool once, at application startup
+init_database(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Generate due-date notifications once a day in the background
+if config.NOTIFICATION_SCHEDULER_ENABLED:
+    start_notification_scheduler()
 
+# Apply notification fan-out in batches off the request path
+if config.WRITE_BEHIND_ENABLED:
+    start_write_behind()
 
-# Decorator to initialize the session before each request
-@app.before_request
-def before_request():
+# Fail requests that exceed the query budget (test runs only)
+init_query_budget(app)
+
+# Report per-request query count and DB time, and log slow queries
+init_query_stats(app)
+
+# Request latency, in-flight requests and pool stats at /metrics
+init_metrics(app)
+
+# Release the request's session at the end of each request
+@app.teardown_appcontext
+def shutdown_session(exception=None):
     """
-    Initialize the database session before each request.
+    Remove the scoped session so its connection returns to the pool.
     """
-    if not hasattr(g, 'session') or not g.session:
-        session = init_database(app.config['SQLALCHEMY_DATABASE_URI'])
-        g.session = session
-        # Assign session to a global variable
-        globals()['session'] = session
+    remove_session(exception)
 
 # Configure Flask-Login
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.init_app(app)
 
-# Configure Flask-Bcrypt
-bcrypt = Bcrypt(app)
+# Configure Flask-Bcrypt; hashing runs on the bounded pool in passwords.py
+app.config['BCRYPT_LOG_ROUNDS'] = config.BCRYPT_ROUNDS
+init_passwords(app)
 
 
-# Ensure responses aren't cached
-@app.after_request
-def after_request(response):
+@app.errorhandler(PasswordHashingBusy)
+def password_hashing_busy(error):
     """
-    Set response headers to ensure they are not cached.
+    Ask the client to retry when every bcrypt worker is taken.
     """
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Expires"] = 0
-    response.headers["Pragma"] = "no-cache"
-    return response
+    return "Too many sign-in attempts right now, please try again.", 503, {'Retry-After': '1'}
+
+
+# Per-endpoint caching: fingerprinted static files, ETags on data pages and
+# no-store for everything else (see config.CACHE_POLICIES)
+init_http_cache(app)
 
 # Load the logged-in user
 @login_manager.user_loader
 def load_user(user_id):
     """
-    Load the user object based on the given user ID.
+    Load the logged-in user's cached authorization fields (see user_cache.py).
+    Deactivated users are logged out.
     """
-
-    return session.query(User).get(int(user_id))
+    user = user_cache.get(session, int(user_id))
+    if user is None or not user.is_active:
+        return None
+    return user
 
 
 @app.route('/')
@@ -85,46 +125,20 @@ def index():
 
     user = current_user
 
-    tasks = session.query(Task).filter(Task.assigned_users.contains(user)).all()
-    projects = user.projects
+    tasks = session.query(Task).filter(Task.assigned_users.any(User.id == user.id)).all()
+    projects = session.query(Project).filter(Project.user_id == user.id).all()
 
     # Query the comments related to the user's tasks
     comments = session.query(Comment).filter(Comment.task_id.in_(task.id for task in tasks)).all()
 
-    # Retrieve the user's received notifications
-    notifications = user.received_notifications
-
-    # Get the current time
-    current_time = datetime.now()
-
-    # Query the tasks with upcoming due dates
-    upcoming_tasks = session.query(Task).filter(Task.due_date > current_time).all()
-
-    # Generate new notifications for upcoming tasks
-    new_notifications = []
-    for task in upcoming_tasks:
-        # Calculate the time remaining until the task's due date
-        time_remaining = task.due_date - current_time.date()
-
-        if time_remaining == timedelta(days=1):
-            notification_content = f"Task '{task.title}' is due tomorrow!"
-        elif time_remaining == timedelta(days=3):
-            notification_content = f"Task '{task.title}' is due in 3 days."
-        elif time_remaining == timedelta(days=7):
-            notification_content = f"Task '{task.title}' is due in 7 days."
-        else:
-            notification_content = f"Task '{task.title}' is due on {task.due_date}."
-
-        # Create a new notification object
-        notification = Notification(task=task, content=notification_content)
-        new_notifications.append(notification)
-
-    # Add the new notifications to the user's existing notifications
-    notifications.extend(new_notifications)
-
-    # Persist the new notifications to the database
-    session.add_all(new_notifications)
-    session.commit()
+    # Retrieve the user's most recent notifications; they are generated by the
+    # scheduled job in notifications.py, not by viewing this page
+    notifications = session.query(Notification).join(
+        user_notification_association,
+        user_notification_association.c.notification_id == Notification.id
+    ).filter(
+        user_notification_association.c.user_id == user.id
+    ).order_by(Notification.timestamp.desc()).limit(config.DASHBOARD_NOTIFICATION_LIMIT).all()
 
     return render_template('index.html', tasks=tasks, projects=projects, comments=comments, notifications=notifications)
 
@@ -179,11 +193,10 @@ def register():
         #    return render_template("register.html", **input_values)
 
         # Hash the password using bcrypt
-        hashed_password = bcrypt.generate_password_hash(password).decode("utf-8")
+        hashed_password = hash_password(password)
 
         # Create a new user object
         new_user = User(username=username, password=hashed_password, email=email, authority=authority)
-        print("new_user.id",new_user.id)
         new_user_info = UserInfo(
             full_name="Full Name",
             age=0,
@@ -224,24 +237,32 @@ def login():
         # Find user by username
         user = session.query(User).filter_by(username=username).first()
 
-        if user and user.is_active:
-            # Check if password is correct
-            #if bcrypt.check_password_hash(user.password, password):
-            #    remember = request.form.get("remember")
-            #    # Log in the user
-            #    login_user(user, remember=remember)
-            #    # Redirect to the dashboard or any desired page
+        # Check if password is correct
+        if user and user.is_active and password and check_password(user.password, password):
+            # Upgrade the hash while the plain password is at hand if the
+            # configured cost changed since it was made
+            if needs_rehash(user.password):
+                user.password = hash_password(password)
+                session.commit()
+
             remember = request.form.get("remember")
             login_user(user, remember=remember)
             return redirect("/")
-            #else:
-            #    flash("Invalid username or password")
         else:
             flash("Invalid username or password")
 
     return render_template("login.html")
 
 
+# Sort keys accepted by /show_tasks, each backed by an index on (column, id)
+TASK_SORT_COLUMNS = {
+    'title': Task.title,
+    'due_date': Task.due_date,
+    'priority': Task.priority,
+    'created_at': Task.created_at,
+    'status': Task.status,
+}
+
 @app.route('/show_tasks')
 @login_required
 def show_tasks():
@@ -251,17 +272,32 @@ def show_tasks():
     search_due_date = request.args.get('due_date')
     search_created_by = request.args.get('created_by')
     search_created_at = request.args.get('created_at')
+    search_priority = request.args.get('priority')
+    search_status = request.args.get('status')
+    search_due_within = request.args.get('due_within', type=int)
 
     # Sort parameters from the query string
     sort_by = request.args.get('sort_by')
 
-    # Fetch tasks based on search parameters from the database or any data source
-    tasks = session.query(Task)
+    # Fetch tasks based on search parameters from the database or any data source,
+    # loading the creator, teams and tags shown in each row up front
+    tasks = session.query(Task).options(
+        joinedload(Task.creator).load_only(User.id, User.username),
+        selectinload(Task.assigned_teams),
+        selectinload(Task.tags),
+    )
+    sort_column = TASK_SORT_COLUMNS.get(sort_by)
     if search_name:
-        tasks = tasks.filter(Task.title.ilike(f"%{search_name}%"))
+        if search.fts_enabled:
+            tasks = search.search_tasks(tasks, name=search_name, ranked=False)
+            # Full-text matches are ranked by relevance unless an explicit sort is requested
+            if sort_column is None:
+                sort_column = search.tasks_fts.c.rank
+        else:
+            tasks = tasks.filter(Task.title.ilike(f"%{search_name}%"))
 
     if search_tags:
-        tasks = tasks.filter(Task.tags.ilike(f"%{search_tags}%"))
+        tasks = search.filter_tasks_by_tags(tasks, search_tags)
 
     if search_due_date:
         tasks = tasks.filter(Task.due_date == search_due_date)
@@ -282,23 +318,39 @@ def show_tasks():
     if search_created_at:
         tasks = tasks.filter(Task.created_at == search_created_at)
 
-    # Apply sorting
-    if sort_by:
-        tasks = tasks.order_by(sort_by)
-
-    tasks = tasks.all()
-    # Create a dictionary to map user IDs to usernames
-    creator_dict = {}
-    users = session.query(User).all()
-    for user in users:
-        creator_dict[user.id] = user.username
+    # Status, priority and due date filters are served by ix_tasks_status_priority_due_date
+    try:
+        if search_status == 'open':
+            tasks = tasks.filter(Task.status.in_(OPEN_TASK_STATUSES))
+        elif search_status:
+            tasks = tasks.filter(Task.status == TaskStatus.coerce(search_status))
+        if search_priority:
+            tasks = tasks.filter(Task.priority == TaskPriority.coerce(search_priority))
+    except ValueError:
+        flash("Invalid status or priority")
+        return redirect("/show_tasks")
+
+    if search_due_within is not None:
+        today = date.today()
+        tasks = tasks.filter(Task.due_date.between(today, today + timedelta(days=search_due_within)))
+
+    # Fetch one page, sorted by the requested column with the id as tie-breaker
+    tasks = paginate(tasks, Task.id, sort_column=sort_column)
     teams = {}
     for task in tasks:
         teams[task.id] = [team.name for team in task.assigned_teams]
-    for task in tasks:
-        print(f"{task.assigned_teams}")
     # Render the show_tasks.html template and pass the tasks to it
-    return render_template('show_tasks.html', tasks=tasks, teams=teams, creator_dict=creator_dict)
+    return render_template('show_tasks.html', tasks=tasks, teams=teams)
+
+
+@app.route('/api/tags')
+@login_required
+def tag_facets():
+    """
+    Return the number of tasks per tag as JSON, most used tags first.
+    """
+    limit = request.args.get('limit', type=int)
+    return jsonify(search.tag_counts(session, limit=limit))
 
 
 @app.route('/create_task', methods=['GET', 'POST'])
@@ -319,19 +371,19 @@ def create_task():
             flash('Invalid due date format. Please use YYYY-MM-DD format.', 'error')
             return redirect('/create_task')  # Redirect back to the create task page to re-enter the date
 
-        priority = request.form['priority']
-        status = request.form['status']
+        try:
+            priority = TaskPriority.coerce(request.form['priority'])
+            status = TaskStatus.coerce(request.form['status'])
+        except ValueError:
+            flash('Invalid priority or status.', 'error')
+            return redirect('/create_task')
         tags = request.form['tags']  # Get the tags from the form input
 
-        # Debug print statements
-        print("Current User:", current_user)
-        print("Tags:", tags)
+        logger.debug("create_task user=%s tags=%r", current_user, tags)
 
         # Ensure the user object has the 'id' attribute
         if hasattr(current_user, 'id'):
             user_id = current_user.id
-            # Debug print statement
-            print("Current User ID:", user_id)
         else:
             # If 'id' attribute is missing, handle the error appropriately
             return "User ID not found"
@@ -348,6 +400,7 @@ def create_task():
 
         session.add(new_task)
         session.commit()
+        notify_due_date_change(new_task)
 
         flash('Task created successfully!', 'success')
         return redirect('/show_tasks')
@@ -367,7 +420,7 @@ def change_password():
         user = session.query(User).get(current_user.id)
 
         # Check if the current password is correct
-        if bcrypt.check_password_hash(user.password, current_password):
+        if check_password(user.password, current_password):
             # Ensure new password and confirmation are provided
             if new_password and confirmation:
                 # Ensure new password and confirmation match
@@ -375,7 +428,7 @@ def change_password():
                     # Ensure password meets complexity criteria
                     if re.search(r"^(?=.*[A-Za-z])(?=.*\d)(?=.*[@$!%*#?&])[A-Za-z\d@$!%*#?&]{8,}$", new_password):
                         # Update the user's password
-                        user.password = bcrypt.generate_password_hash(new_password).decode("utf-8")
+                        user.password = hash_password(new_password)
                         session.commit()
                         flash("Password changed successfully!", "success")
                         return redirect("/")
@@ -397,10 +450,12 @@ def deactivate_user():
         # Get current password from form
         current_password = request.form.get("current_password")
 
+        user = session.query(User).get(current_user.id)
+
         # Verify the current password
-        if bcrypt.check_password_hash(current_user.password, current_password):
+        if check_password(user.password, current_password):
             # Deactivate the user account
-            current_user.is_active = False
+            user.is_active = False
             session.commit()
             flash("User account deactivated successfully! Please contact the administrator for reactivation.", "success")
             # Log out the user after deactivating the account
@@ -446,11 +501,10 @@ def user_info():
 
                 session.commit()
                 flash('User information updated successfully!', 'success')
-            except Exception as e:
+            except Exception:
                 session.rollback()
                 flash('An error occurred while updating user information.', 'error')
-                # Log the error for debugging purposes
-                print(f'Error: {str(e)}')
+                logger.exception("Updating user info of user %s failed", user.id)
 
     return render_template('user_info.html', user=user, user_info=user_info)
 
@@ -467,23 +521,14 @@ def logout():
 @login_required
 def show_workers():
     # Logic to retrieve worker information
-    all_users = session.query(User).all()
-    if all_users is None:
-        print("No users found")
-    else:
-        for user in all_users:
-            if user.user_info:
-                print("raw user info:", user.user_info)
-                print(
-                    f"User Info for {user.username}: {user.user_info.full_name}, {user.user_info.age}, {user.user_info.address}")
-            else:
-                print(f"No User Info for {user.username}")
+    all_users = paginate(session.query(User).options(joinedload(User.user_info)), User.id)
+    logger.debug("show_workers users=%d", len(all_users))
     return render_template('show_workers.html', users=all_users)
 
 @app.route('/manage_workers')
 @login_required
 def manage_workers():
-    workers = session.query(User).all()
+    workers = paginate(session.query(User), User.id)
     return render_template('manage_workers.html', workers=workers)
 
 @app.route('/manage_workers_user_info/<int:user_id>', methods=['GET', 'POST'])
@@ -521,9 +566,10 @@ def forgot_password():
         user = session.query(User).filter_by(email=email).first()
 
         if user:
-            hashed_password=bcrypt.generate_password_hash("password").decode("utf-8")
-            # Update the user's password in memory
+            hashed_password = hash_password("password")
+            # Update the user's password
             user.password = hashed_password
+            session.commit()
 
             # Redirect the user to a confirmation or success page
             return redirect('/login')
@@ -552,10 +598,8 @@ def append_workers():
                 flash('User is already assigned to the task.')
                 return redirect('/append_workers')
 
-            # Append the user to the task's workers list
-            user.task_number += 1
-            user.task_priority += calculate_user_task_priority(task.priority)
-
+            # Append the user to the task's workers list; the workload
+            # counters are updated by the triggers in counters.py
             task.assigned_users.append(user)
 
             # Commit the changes to the database
@@ -567,16 +611,11 @@ def append_workers():
             flash('Invalid task or worker.', 'danger')
             return redirect('/append_workers')
 
-    # Retrieve the list of tasks and users
-    tasks = session.query(Task).all()
-    users = session.query(User).all()
+    # Retrieve one page of tasks and one page of users
+    tasks = paginate(session.query(Task), Task.id, prefix='task_')
+    users = paginate(session.query(User).options(joinedload(User.user_info)), User.id, prefix='user_')
 
-    for user in users:
-        print(user.id)
-
-    for task in tasks:
-        if task is not None:  # Check if task is not None
-            print(task.title)
+    logger.debug("append_workers users=%d tasks=%d", len(users), len(tasks))
 
     return render_template('append_workers.html', tasks=tasks, users=users)
 
@@ -592,7 +631,8 @@ def create_project():
         tasks = session.query(Task).filter(Task.id.in_(selected_task_ids)).all()
 
         # Create the project with the selected tasks
-        project = Project(name=name, user=current_user, description=description)
+        user = session.query(User).get(current_user.id)
+        project = Project(name=name, user=user, description=description)
         project.tasks = tasks
 
         session.add(project)
@@ -601,8 +641,8 @@ def create_project():
         flash('Project created successfully.', 'success')
         return redirect('/projects')
 
-    # Retrieve all tasks to display in the form
-    tasks = session.query(Task).all()
+    # Retrieve one page of tasks to display in the form
+    tasks = paginate(session.query(Task), Task.id)
 
     return render_template('create_project.html', tasks=tasks)
 
@@ -610,7 +650,10 @@ def create_project():
 @app.route('/projects')
 @login_required
 def projects():
-    projects = session.query(Project).all()
+    projects = paginate(session.query(Project).options(
+        selectinload(Project.tasks),
+        selectinload(Project.assigned_teams).selectinload(Team.team_members).joinedload(User.user_info),
+    ), Project.id)
     return render_template('projects.html', projects=projects)
 
 
@@ -648,7 +691,7 @@ def show_task():
         comment_content = request.form.get('comment_content')
 
         # Retrieve the task details based on the selected task ID
-        selected_task = session.query(Task).options(joinedload(Task.assigned_users)).get(task_id)
+        selected_task = session.query(Task).options(joinedload(Task.assigned_users).joinedload(User.user_info)).get(task_id)
         tasks = session.query(Task).all()
 
         # Access the authority value of the current user
@@ -674,23 +717,32 @@ def show_task():
             selected_due_date_str = request.form.get('edit_due_date')  # Get the due date string
             try:
                 selected_due_date = datetime.strptime(selected_due_date_str, '%Y-%m-%d').date()  # Convert string to date object
+                due_date_changed = selected_task.due_date != selected_due_date
                 selected_task.due_date = selected_due_date
             except ValueError:
                 flash('Invalid due date format. Please use YYYY-MM-DD format.', 'error')
                 return redirect('/show_task')
 
-            selected_task.priority = request.form.get('edit_priority')
+            try:
+                selected_priority = TaskPriority.coerce(request.form.get('edit_priority'))
+                selected_status = TaskStatus.coerce(request.form.get('edit_status'))
+            except ValueError:
+                flash('Invalid priority or status.', 'error')
+                return redirect('/show_task')
+
+            selected_task.priority = selected_priority
             # Check if the status is being changed
-            if request.form.get('edit_status') != selected_task.status:
-                selected_task.status = request.form.get('edit_status')
-                if selected_task.status == 'Completed':
-                    current_user.completed_task_number += 1
-                    print(f"priority= {selected_task.priority}")
-                    print(f"calculate_user_task_priority(selected_task.status)={calculate_user_task_priority(selected_task.priority)}")
-                    current_user.completed_task_priority += calculate_user_task_priority(selected_task.priority)
+            if selected_status != selected_task.status:
+                selected_task.status = selected_status
+                # Completion credit goes to the assignees (see counters.py)
+                if selected_task.status == TaskStatus.COMPLETED:
                     flash('Task completed successfully!', 'success')
                 flash('Task Status Updated!')
-                session.commit()
+            session.commit()
+
+            # Re-evaluate due-date reminders for the new due date
+            if due_date_changed:
+                notify_due_date_change(selected_task)
 
         # Add the new comment to the selected task
         if comment_content:
@@ -712,48 +764,63 @@ def create_team():
         team_name = request.form.get('team_name')
         user_ids = request.form.getlist('users')
         description = request.form.get('team_description')  # Retrieve a single value
-        print("user input:")
-        print(f"team_name={team_name}")
-        print(f"user_ids={user_ids}")
-        print(f"description={description}")
-        team_members = session.query(User).filter(User.id.in_(user_ids)).all()
-
-        team = Team(name=team_name, description=description, team_members=team_members)
-
-        # Retrieve roles for each team member
+        # Roles are submitted in the same order as the selected members
         roles = request.form.getlist('roles')
-        for i, user_id in enumerate(user_ids):
-            role = roles[i]
-            user = session.query(User).get(user_id)
-            if user:
-                team_member_role = TeamMemberRole(role=role)
-                team_member_role.user = user
-                team_member_role.team = team
-                session.add(team_member_role)
+        members = [(user_id, roles[i] if i < len(roles) else None) for i, user_id in enumerate(user_ids)]
 
-        session.add(team)
+        try:
+            create_teams(session, [{'name': team_name, 'description': description, 'members': members}])
+        except UnknownMembers:
+            flash("Some of the selected users no longer exist.")
+            return redirect('/create_team')
+        except (ValueError, TypeError):
+            flash("Invalid team members.")
+            return redirect('/create_team')
         session.commit()
 
         flash("Team successfully created!")
         return redirect('/teams')
 
-    users = session.query(User).all()
+    users = session.query(User).options(joinedload(User.user_info)).all()
     return render_template('create_team.html', users=users)
 
-    users = session.query(User).all()
-    return render_template('create_team.html', users=users)
+@app.route('/api/teams', methods=['POST'])
+@login_required
+def create_teams_bulk():
+    """
+    Create many teams at once from a JSON list of
+    {"name", "description", "members": [{"user_id", "role"}]} objects.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        return jsonify(error='Expected a JSON list of teams.'), 400
+
+    teams = []
+    for item in payload:
+        if not isinstance(item, dict) or not item.get('name'):
+            return jsonify(error='Every team needs a name.'), 400
+        try:
+            members = [(member['user_id'], member.get('role')) for member in item.get('members', [])]
+        except (KeyError, TypeError, AttributeError):
+            return jsonify(error='Every member needs a user_id.'), 400
+        teams.append({'name': item['name'], 'description': item.get('description'), 'members': members})
+
+    try:
+        team_ids = create_teams(session, teams)
+    except UnknownMembers as error:
+        return jsonify(error=str(error), user_ids=sorted(error.user_ids)), 400
+    except (ValueError, TypeError):
+        return jsonify(error='User ids must be integers.'), 400
+    session.commit()
+    return jsonify(team_ids=team_ids), 201
 
 @app.route('/teams')
 @login_required
 def teams():
-    teams = session.query(Team).all()
-    print(teams)
-
-    for team in teams:
-        print("Team Name:", team.name)
-        print("Team Members:")
-        for member in team.team_members:
-            print(member.username)
+    teams = paginate(session.query(Team).options(
+        selectinload(Team.team_members).joinedload(User.user_info)
+    ), Team.id)
+    logger.debug("teams teams=%d", len(teams))
 
     return render_template('teams.html', teams=teams)
 
@@ -764,7 +831,6 @@ def edit_team(team_id):
     if request.method == 'GET':
         team = session.query(Team).get(team_id)
         if team:
-            print("Team:", team.name)
             return render_template('edit_team.html', team=team)
         else:
             flash('Team not found!')
@@ -776,7 +842,6 @@ def edit_team(team_id):
 
         team = session.query(Team).get(team_id)
         if team:
-            print("Team:", team.name)
             member_role = None
             for user in team.team_members:
                 if user.id == int(member_id):
@@ -798,7 +863,7 @@ def edit_team(team_id):
 
         team = session.query(Team).get(team_id)  # Retrieve the updated team from the database
         if team:
-            print("Updated Team:", team.name)
+            logger.debug("edit_team updated team=%s", team_id)
             return render_template('edit_team.html', team=team)
         else:
             flash('Team not found!')
@@ -840,21 +905,10 @@ def assign_tasks():
             flash('Invalid team or task selection.')
             return redirect('/assign_tasks_to_teams')
 
-        if team and task:
-            # Append the task to the team's assigned_tasks list
-            team.assigned_tasks.append(task)
-            for user in team.team_members:
-                # Check if the user is already assigned to the task
-                if task in user.assigned_tasks:
-                    continue  # Skip this user
-
-                task.assigned_users.append(user)
-                # Update the task tracking attributes
-                user.task_number += 1
-                user.task_priority += calculate_user_task_priority(task.priority)
-
-            session.commit()
-            flash('Task assigned to the team successfully!')
+        # Assign the team and the members not yet assigned to the task in bulk
+        assign_team_to_tasks(session, team.id, [task.id])
+        session.commit()
+        flash('Task assigned to the team successfully!')
 
         # Redirect to the task listing page or display a success message
         return redirect('/show_tasks')
@@ -873,8 +927,6 @@ def assign_teams_to_projects():
         return redirect('/')
 
     if request.method == 'POST':
-        # Get the form data
-        # Get the form data
         # Get the form data
         team_id = request.form.get('team_id')
         project_id = request.form.get('project_id')
@@ -882,37 +934,19 @@ def assign_teams_to_projects():
         # Retrieve the team and project objects
         team = session.query(Team).get(team_id)
         project = session.query(Project).get(project_id)
-        print(f"choosen team={team.id}")
-        print(f"choosen project={project.id}")
-        if team and project:
-            print(f"if team and project happened")
-            # Get all tasks in the project
-            tasks = session.query(Task).filter(Task.associated_project.any(id=project.id)).all()
-            print(f"tasks={tasks}")
-
-            # Check if the team is already assigned to the project
-            if team in project.assigned_teams:
-                flash('The team is already assigned to the project.')
-                return redirect('/assign_teams_to_projects')
-
-            # Assign users in the team to each task in the project
-            for task in tasks:
-                task.assigned_teams.append(team)
-                for user in team.team_members:
-                    # Check if the user is already assigned to the task
-                    if user not in task.assigned_users:
-                        # Append the user to the task's assigned users
-                        task.assigned_users.append(user)
-                        print(f"user={user.user_info.full_name} appended to task={task.title}")
-                        print(f"current situation; task.assigned_users={task.assigned_users}")
-                        # Update the user's task tracking attributes
-                        user.task_number += 1
-                        user.task_priority += calculate_user_task_priority(task.priority)
-            # Append the team to the project's assigned teams
-            project.assigned_teams.append(team)
+        if not team or not project:
+            flash('Invalid team or project selection.')
+            return redirect('/assign_teams_to_projects')
 
-            session.commit()
-            flash('Teams assigned to the project successfully!')
+        # Check if the team is already assigned to the project
+        if team_assigned_to_project(session, team.id, project.id):
+            flash('The team is already assigned to the project.')
+            return redirect('/assign_teams_to_projects')
+
+        # Assign the team and its members to every task of the project in bulk
+        assign_team_to_project(session, team.id, project.id)
+        session.commit()
+        flash('Teams assigned to the project successfully!')
 
         # Redirect to the appropriate page or display a success message
         return redirect('/assign_teams_to_projects')
@@ -931,7 +965,7 @@ def worker_performance():
         sort_by = request.form.get("sort-by")
         filter_by = request.form.get("filter-by")
 
-        users = session.query(User).join(User.user_info)
+        users = session.query(User).join(User.user_info).options(contains_eager(User.user_info))
 
         if sort_by == "name":
             users = users.order_by(UserInfo.full_name)
@@ -954,19 +988,19 @@ def worker_performance():
         # Get the unique departments of current users
         departments = session.query(UserInfo.department.distinct()).join(User).filter(User.is_active).all()
         department_options = [dept[0] for dept in departments]
-        print(f"department_options={department_options}")
+        logger.debug("worker_performance departments=%s", department_options)
 
         # Pass the sorted and filtered users to the template for rendering
         return render_template("worker_performance.html", users=users, department_options=department_options)
 
     # Render the initial page with unsorted/unfiltered data
-    users = session.query(User).all()
+    users = session.query(User).options(joinedload(User.user_info)).all()
     departments = session.query(UserInfo.department.distinct()).join(User).filter(User.is_active).all()
 
     department_options = []
     department_options = [dept[0] for dept in departments]
 
-    print(f"department_options={department_options}")
+    logger.debug("worker_performance departments=%s", department_options)
 
     # Pass the users and department options to the template for rendering
     return render_template("worker_performance.html", users=users, department_options=department_options)
@@ -979,42 +1013,81 @@ def worker_performance_graphs():
         # Redirect or abort here if the user doesn't have the required authority
         # For example, you can redirect them to a different page or display an error message
         return "You do not have permission to access this page."
-    # Retrieve the user data from the database
-    users = session.query(User).all()
-
-    # Prepare data for the chart
-    departments = []
-    completion_rates = []
-
-    for user in users:
-        departments.append(user.user_info.department)
-        if user.task_number != 0:
-            completion_rate = user.completed_task_number / user.task_number
-        else:
-            completion_rate = 0
-        completion_rates.append(completion_rate)
-
-    # Create the bar chart
-    plt.bar(departments, completion_rates)
-    plt.xlabel('Department')
-    plt.ylabel('Completion Rate')
-    plt.title('Worker Performance')
-
-    # Create the charts directory if it doesn't exist
-    chart_directory = os.path.join(app.static_folder, 'charts')
-    if not os.path.exists(chart_directory):
-        os.makedirs(chart_directory)
+    # Aggregate completion rates per department in SQL
+    stats = department_performance(session)
 
-    # Save the chart to the charts directory
-    chart_file = os.path.join(chart_directory, 'worker_performance_chart.png')
-    plt.savefig(chart_file)
+    # Render the bar chart, or reuse the file rendered for the same data
+    chart_filename = charts.render_bar_chart(
+        CHART_DIRECTORY, 'worker_performance',
+        [row['department'] for row in stats], [row['mean_rate'] for row in stats],
+        xlabel='Department', ylabel='Mean Completion Rate', title='Worker Performance',
+    )
 
-    # Pass the relative file path to the template for rendering
-    chart_filename = 'charts/worker_performance_chart.png'
-
-    # Render the templatsqe and pass the chart filename
+    # Render the template and pass the chart filename
     return render_template('worker_performance_graphs.html', chart_filename=chart_filename)
 
+@app.route("/worker_performance/departments")
+@login_required
+def worker_performance_departments():
+    """
+    Return the per-department completion rate aggregates behind the chart as JSON.
+    """
+    if current_user.authority != 1:
+        abort(403)
+    return jsonify(department_performance(session))
+
 @app.route('/charts/<path:filename>')
 def serve_chart(filename):
-    return send_from_directory('static', filename)
+    """
+    Serve a rendered chart. Chart file names change with their data, so they
+    can be cached for long; ETag and Last-Modified allow revalidation.
+    """
+    return send_from_directory(CHART_DIRECTORY, filename, conditional=True, etag=True, max_age=config.CHART_MAX_AGE)
+
+@app.cli.command('check-sort-indexes')
+def check_sort_indexes():
+    """
+    Verify that every /show_tasks sort key is served by an index.
+    """
+    sample_values = {
+        'title': 'm',
+        'due_date': date.today(),
+        'priority': TaskPriority.MEDIUM,
+        'created_at': datetime(2000, 1, 1),
+        'status': TaskStatus.IN_PROGRESS,
+    }
+    failures = []
+    for key, column in TASK_SORT_COLUMNS.items():
+        uses_index, plans = explain_sort(session, session.query(Task), Task.id, column, sample_values[key])
+        status = 'ok' if uses_index else 'NOT INDEXED'
+        print(f"{key}: {status}")
+        for plan in plans:
+            print(f"    {'; '.join(plan)}")
+        if not uses_index:
+            failures.append(key)
+    session.remove()
+
+    if failures:
+        raise SystemExit(f"Sort keys without an index: {', '.join(failures)}")
+
+@app.cli.command('recompute-counters')
+@click.option('--check', is_flag=True, help='Only report users whose counters have drifted.')
+def recompute_counters_command(check):
+    """
+    Rebuild every user's workload counters from their task assignments.
+    """
+    drift = counter_drift(session)
+    for user_id, stored, actual in drift:
+        print(f"user {user_id}: stored {stored}, actual {actual}")
+    print(f"{len(drift)} user(s) with drifted counters")
+
+    if check:
+        session.remove()
+        if drift:
+            raise SystemExit(1)
+        return
+
+    recompute_counters(session)
+    session.commit()
+    session.remove()
+    print("Counters recomputed")
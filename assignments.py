@@ -0,0 +1,71 @@
+from sqlalchemy import exists, insert, select, true
+
+from models import (Task, user_task_association, team_user_association,
+                    team_task_association, project_task_association, project_team_association)
+
+
+def _missing_assignments(team_id, task_ids):
+    """
+    Select (user_id, task_id) for every member of the team and every task in
+    task_ids where the member is not assigned to the task yet.
+    """
+    members = select(team_user_association.c.user_id).where(
+        team_user_association.c.team_id == team_id
+    ).distinct().subquery()
+
+    already_assigned = exists().where(
+        user_task_association.c.user_id == members.c.user_id,
+        user_task_association.c.task_id == Task.id,
+    )
+    return select(members.c.user_id, Task.id).select_from(members).join(Task, true()).where(
+        Task.id.in_(task_ids), ~already_assigned
+    )
+
+
+def assign_team_to_tasks(session, team_id, task_ids):
+    """
+    Assign the team and all of its members to the given tasks in a fixed
+    number of statements, whatever the team and task counts.
+
+    task_ids may be a list or a select of task ids. Members already assigned
+    to a task are skipped. The members' workload counters are kept up to date
+    by the triggers in counters.py.
+    Returns the number of (user, task) assignments added.
+    """
+    missing = _missing_assignments(team_id, task_ids)
+    added = session.execute(
+        insert(user_task_association).from_select(['user_id', 'task_id'], missing)
+    ).rowcount
+
+    # Link the team itself to the tasks it is not linked to yet
+    team_linked = exists().where(
+        team_task_association.c.task_id == Task.id,
+        team_task_association.c.team_id == team_id,
+    )
+    session.execute(
+        insert(team_task_association).from_select(
+            ['task_id', 'team_id'],
+            select(Task.id, team_id).where(Task.id.in_(task_ids), ~team_linked),
+        )
+    )
+    return added
+
+
+def assign_team_to_project(session, team_id, project_id):
+    """
+    Assign the team to the project and, in bulk, to every task of the project.
+    Returns the number of (user, task) assignments added.
+    """
+    project_task_ids = select(project_task_association.c.task_id).where(
+        project_task_association.c.project_id == project_id
+    )
+    added = assign_team_to_tasks(session, team_id, project_task_ids)
+    session.execute(insert(project_team_association).values(project_id=project_id, team_id=team_id))
+    return added
+
+
+def team_assigned_to_project(session, team_id, project_id):
+    return session.query(exists().where(
+        project_team_association.c.project_id == project_id,
+        project_team_association.c.team_id == team_id,
+    )).scalar()
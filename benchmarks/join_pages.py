@@ -0,0 +1,164 @@
+"""
+Join benchmark: response time of the join-heavy pages with and without the
+foreign key and association table indexes.
+
+The app is booted against a temporary database filled with generated data.
+Each page is requested with every index in place, then again after dropping
+the indexes added by the 95fe9ebe739a migration, and the median times are
+compared.
+
+Usage: python benchmarks/join_pages.py [--users 2000] [--tasks 20000] [--requests 15]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATION = os.path.join(ROOT, 'alembic', 'versions', '95fe9ebe739a_index_foreign_keys_and_association_tables.py')
+
+# (method, url, form data) of the pages that join through the indexed columns
+PAGES = [
+    ('GET', '/', None),
+    ('GET', '/teams', None),
+    ('GET', '/projects', None),
+    ('GET', '/show_workers', None),
+    ('GET', '/show_tasks', None),
+    ('GET', '/edit_team/1', None),
+    ('POST', '/show_task', {'task_id': '1'}),
+]
+
+
+def load_indexes():
+    spec = importlib.util.spec_from_file_location('join_indexes', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.INDEXES
+
+
+def seed(session, args):
+    from sqlalchemy import insert
+    from passwords import hash_password
+    from models import (User, UserInfo, Task, Team, Project, Comment, Notification, TaskPriority, TaskStatus,
+                        user_task_association, team_user_association, team_task_association,
+                        project_task_association, project_team_association, user_notification_association,
+                        task_notification_association)
+
+    rng = random.Random(0)
+    password = hash_password('benchmark')
+    session.execute(insert(User), [
+        {'username': f'user{i}', 'password': password, 'email': f'user{i}@example.com', 'authority': 1}
+        for i in range(args.users)
+    ])
+    session.execute(insert(UserInfo), [
+        {'user_id': i + 1, 'full_name': f'User {i}', 'department': f'Department {i % 10}'} for i in range(args.users)
+    ])
+    today = date.today()
+    session.execute(insert(Task), [
+        {'title': f'Task {i}', 'description': 'generated', 'due_date': today + timedelta(days=rng.randint(-30, 90)),
+         'priority': rng.choice(list(TaskPriority)), 'status': rng.choice(list(TaskStatus)),
+         'created_by': rng.randint(1, args.users)}
+        for i in range(args.tasks)
+    ])
+    session.execute(insert(user_task_association), [
+        {'user_id': user_id, 'task_id': task_id}
+        for task_id in range(1, args.tasks + 1) for user_id in rng.sample(range(1, args.users + 1), 4)
+    ])
+
+    teams = max(1, args.users // 10)
+    session.execute(insert(Team), [{'name': f'Team {i}', 'description': 'generated'} for i in range(teams)])
+    session.execute(insert(team_user_association), [
+        {'team_id': (user_id - 1) % teams + 1, 'user_id': user_id} for user_id in range(1, args.users + 1)
+    ])
+    session.execute(insert(team_task_association), [
+        {'team_id': rng.randint(1, teams), 'task_id': task_id} for task_id in range(1, args.tasks + 1)
+    ])
+
+    projects = max(1, args.tasks // 100)
+    session.execute(insert(Project), [
+        {'name': f'Project {i}', 'description': 'generated', 'user_id': rng.randint(1, args.users)}
+        for i in range(projects)
+    ])
+    session.execute(insert(project_task_association), [
+        {'project_id': (task_id - 1) % projects + 1, 'task_id': task_id} for task_id in range(1, args.tasks + 1)
+    ])
+    session.execute(insert(project_team_association), [
+        {'project_id': project_id, 'team_id': rng.randint(1, teams)} for project_id in range(1, projects + 1)
+    ])
+
+    session.execute(insert(Comment), [
+        {'content': 'generated', 'author': 'user0', 'task_id': rng.randint(1, args.tasks)} for _ in range(args.tasks * 2)
+    ])
+    session.execute(insert(Notification), [
+        {'content': 'generated', 'task_id': task_id} for task_id in range(1, args.tasks + 1)
+    ])
+    session.execute(insert(task_notification_association), [
+        {'task_id': task_id, 'notification_id': task_id} for task_id in range(1, args.tasks + 1)
+    ])
+    session.execute(insert(user_notification_association), [
+        {'user_id': user_id, 'notification_id': notification_id}
+        for notification_id in range(1, args.tasks + 1) for user_id in rng.sample(range(1, args.users + 1), 3)
+    ])
+    session.commit()
+
+
+def measure(client, requests):
+    timings = {}
+    for method, url, data in PAGES:
+        # One untimed request warms the template and SQLite page caches
+        client.open(url, method=method, data=data)
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise SystemExit(f"{method} {url} returned {response.status_code}")
+        timings[(method, url)] = statistics.median(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'join_pages.db')
+        os.environ['NOTIFICATION_SCHEDULER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+
+        import app
+        from database import session
+        from sqlalchemy import text
+
+        print(f"seeding {args.users} users and {args.tasks} tasks ...")
+        seed(session, args)
+        session.remove()
+
+        client = app.app.test_client()
+        client.post('/login', data={'username': 'user0', 'password': 'benchmark'})
+
+        after = measure(client, args.requests)
+        for name, table, columns in load_indexes():
+            session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        session.commit()
+        session.remove()
+        before = measure(client, args.requests)
+
+    print(f"{'page':<28}{'without':>12}{'with':>12}{'speedup':>10}")
+    for method, url, data in PAGES:
+        old, new = before[(method, url)], after[(method, url)]
+        print(f"{method + ' ' + url:<28}{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{old / new:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
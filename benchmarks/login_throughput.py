@@ -0,0 +1,116 @@
+"""
+Login benchmark: login throughput and latency at several bcrypt costs.
+
+The app is booted against a temporary database. For every cost, users with
+hashes of that cost are created and client threads log in repeatedly for a
+fixed time, while one more thread requests a page that does no hashing to
+show how much the login storm slows down the rest of the app.
+
+Usage: python benchmarks/login_throughput.py [--costs 4 8 10 12] [--threads 8] [--seconds 5] [--workers 2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = 'benchmark'
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[int(len(samples) * fraction)] if samples else 0
+
+
+def login_client(app, username, deadline, results):
+    client = app.test_client()
+    logins, rejected, times = 0, 0, []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = client.post('/login', data={'username': username, 'password': PASSWORD})
+        times.append(time.perf_counter() - start)
+        if response.status_code == 302:
+            logins += 1
+        elif response.status_code == 503:
+            rejected += 1
+        else:
+            raise SystemExit(f"login of {username} returned {response.status_code}")
+        client.get('/logout')
+    results.append((logins, rejected, times))
+
+
+def page_client(app, deadline, times):
+    client = app.test_client()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        client.get('/login')
+        times.append(time.perf_counter() - start)
+
+
+def run_cost(app, session, cost, args):
+    import config
+    from sqlalchemy import insert
+    from models import User
+    from passwords import bcrypt
+
+    # Hashes made with this cost, so logins don't rehash
+    config.BCRYPT_ROUNDS = cost
+    password_hash = bcrypt.generate_password_hash(PASSWORD, cost).decode()
+    usernames = [f'cost{cost}_user{i}' for i in range(args.threads)]
+    session.execute(insert(User), [
+        {'username': name, 'password': password_hash, 'email': f'{name}@example.com', 'authority': 0}
+        for name in usernames
+    ])
+    session.commit()
+    session.remove()
+
+    results, page_times = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=login_client, args=(app.app, name, deadline, results)) for name in usernames]
+    threads.append(threading.Thread(target=page_client, args=(app.app, deadline, page_times)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    logins = sum(result[0] for result in results)
+    rejected = sum(result[1] for result in results)
+    login_times = [sample for result in results for sample in result[2]]
+    return (logins / args.seconds, rejected, statistics.median(login_times or [0]),
+            percentile(login_times, 0.95), percentile(page_times, 0.95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--costs', type=int, nargs='+', default=[4, 8, 10, 12])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, help='bcrypt workers (default: config.BCRYPT_WORKERS)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'login.db')
+        os.environ['NOTIFICATION_SCHEDULER_ENABLED'] = '0'
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        if args.workers:
+            os.environ['BCRYPT_WORKERS'] = str(args.workers)
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+
+        import app
+        import config
+        from database import session
+
+        print(f"{args.threads} login threads, {config.BCRYPT_WORKERS} bcrypt workers, {args.seconds:g}s per cost")
+        print(f"{'cost':<6}{'logins/s':>10}{'503s':>7}{'login p50':>12}{'login p95':>12}{'page p95':>12}")
+        for cost in args.costs:
+            rate, rejected, p50, p95, page_p95 = run_cost(app, session, cost, args)
+            print(f"{cost:<6}{rate:>10.1f}{rejected:>7}{p50 * 1000:>10.1f}ms{p95 * 1000:>10.1f}ms{page_p95 * 1000:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
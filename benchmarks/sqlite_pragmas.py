@@ -0,0 +1,126 @@
+"""
+SQLite pragma benchmark: mixed read/write throughput of each pragma profile.
+
+For every profile in config.SQLITE_PRAGMA_PROFILES a fresh database is filled
+with generated tasks, then worker threads run for a fixed time. Each worker
+mixes page reads (a sorted, joined page of tasks) with short write
+transactions (a comment and a task update), like the app under load.
+
+Usage: python benchmarks/sqlite_pragmas.py [--threads 8] [--seconds 5] [--write-ratio 0.2] [--profiles wal default]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+
+import config
+from counters import init_counters
+from database import create_database_engine
+from models import Base, User, Task, Comment, TaskPriority, TaskStatus, user_task_association
+from search import init_task_search
+
+
+def seed(engine, tasks):
+    rng = random.Random(0)
+    today = date.today()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'username': f'user{i}', 'password': 'x', 'email': f'user{i}@example.com'} for i in range(100)
+        ])
+        connection.execute(insert(Task), [
+            {'title': f'Task {i}', 'description': 'generated', 'due_date': today + timedelta(days=rng.randint(0, 365)),
+             'priority': rng.choice(list(TaskPriority)), 'status': rng.choice(list(TaskStatus)),
+             'created_by': rng.randint(1, 100)}
+            for i in range(tasks)
+        ])
+        connection.execute(insert(user_task_association), [
+            {'user_id': rng.randint(1, 100), 'task_id': task_id} for task_id in range(1, tasks + 1)
+        ])
+
+
+def worker(engine, tasks, write_ratio, deadline, seed_value, results):
+    rng = random.Random(seed_value)
+    reads, writes, errors, read_times = 0, 0, 0, []
+    page = select(Task.id, Task.title, User.username).join(User, User.id == Task.created_by)
+    while time.perf_counter() < deadline:
+        task_id = rng.randint(1, tasks)
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as connection:
+                    connection.execute(insert(Comment).values(content='benchmark', author='user0', task_id=task_id))
+                    connection.execute(
+                        update(Task).where(Task.id == task_id).values(status=rng.choice(list(TaskStatus)))
+                    )
+                writes += 1
+            else:
+                with engine.connect() as connection:
+                    due_date = date.today() + timedelta(days=rng.randint(0, 365))
+                    connection.execute(
+                        page.where(Task.due_date >= due_date).order_by(Task.due_date, Task.id).limit(config.PAGE_SIZE)
+                    ).all()
+                read_times.append(time.perf_counter() - start)
+                reads += 1
+        except OperationalError:
+            # "database is locked" once the busy timeout runs out
+            errors += 1
+    results.append((reads, writes, errors, read_times))
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine('sqlite:///' + os.path.join(directory, 'bench.db'), pragma_profile=profile)
+        Base.metadata.create_all(engine)
+        init_task_search(engine)
+        init_counters(engine)
+        seed(engine, args.tasks)
+
+        results = []
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=(engine, args.tasks, args.write_ratio, deadline, i, results))
+            for i in range(args.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    errors = sum(result[2] for result in results)
+    read_times = sorted(time for result in results for time in result[3])
+    p95 = read_times[int(len(read_times) * 0.95)] if read_times else 0
+    return reads / args.seconds, writes / args.seconds, errors, statistics.median(read_times or [0]), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--profiles', nargs='+', default=list(config.SQLITE_PRAGMA_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s per profile, {args.write_ratio:.0%} writes")
+    print(f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'errors':>8}{'read p50':>11}{'read p95':>11}")
+    for profile in args.profiles:
+        reads, writes, errors, p50, p95 = run_profile(profile, args)
+        print(f"{profile:<10}{reads:>10.0f}{writes:>10.0f}{errors:>8}{p50 * 1000:>9.2f}ms{p95 * 1000:>9.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup benchmark: import time and resident memory of a freshly booted app.
+
+Each run imports app.py in a new interpreter and reports the median import
+time and peak RSS. The script exits with status 1 when either exceeds its
+threshold, or when a module that should be imported lazily was loaded at boot.
+
+Usage: python benchmarks/startup.py [--runs 5] [--max-seconds 1.5] [--max-rss-mb 120]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only needed by specific routes; importing them at boot is a regression
+LAZY_MODULES = ['matplotlib', 'numpy']
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, NOTIFICATION_SCHEDULER_ENABLED='0')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=1.5)
+    parser.add_argument('--max-rss-mb', type=float, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = 'sqlite:///' + os.path.join(directory, 'startup.db')
+        # The first run creates the schema; it is not counted
+        measure_once(database_url)
+        results = [measure_once(database_url) for _ in range(args.runs)]
+
+    seconds = statistics.median(result['seconds'] for result in results)
+    rss_mb = statistics.median(result['rss_kb'] for result in results) / 1024
+    loaded = sorted({name for result in results for name in result['loaded']})
+
+    print(f"import time: {seconds * 1000:.0f} ms (threshold {args.max_seconds * 1000:.0f} ms)")
+    print(f"peak RSS:    {rss_mb:.1f} MB (threshold {args.max_rss_mb:.0f} MB)")
+    print(f"lazy modules loaded at boot: {', '.join(loaded) or 'none'}")
+
+    failed = seconds > args.max_seconds or rss_mb > args.max_rss_mb or loaded
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from metrics import CHARTS
+
+# matplotlib is imported inside the rendering functions: it is slow to import
+# and large in memory, and only needed when a chart is actually (re)drawn
+
+# Number of rendered versions of a chart kept on disk
+CHART_VERSIONS_KEPT = 5
+
+
+def chart_filename(name, data):
+    """
+    Build a file name for a chart from a hash of the data it is drawn from,
+    so a chart is only rendered again when its data changes.
+    """
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{name}_{digest[:16]}.png"
+
+
+def _write_atomically(figure, path):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    # Render to a temporary file next to the target and rename it into place,
+    # so concurrent requests never see a partially written image
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.png.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            FigureCanvasAgg(figure).print_png(tmp_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _prune_old_versions(directory, name, keep):
+    versions = [
+        os.path.join(directory, filename) for filename in os.listdir(directory)
+        if filename.startswith(name + '_') and filename.endswith('.png')
+    ]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def render_bar_chart(directory, name, labels, values, xlabel, ylabel, title):
+    """
+    Return the file name of a bar chart of values, rendering it into directory
+    only if no chart for the same data exists yet.
+    """
+    filename = chart_filename(name, {'labels': labels, 'values': values, 'title': title})
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        CHARTS.inc(result='reused')
+        return filename
+
+    os.makedirs(directory, exist_ok=True)
+
+    from matplotlib.figure import Figure
+
+    # A standalone Figure keeps no global pyplot state between requests
+    figure = Figure()
+    axes = figure.subplots()
+    axes.bar(labels, values)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+    axes.set_title(title)
+
+    _write_atomically(figure, path)
+    _prune_old_versions(directory, name, CHART_VERSIONS_KEPT)
+    CHARTS.inc(result='rendered')
+    return filename
@@ -2,5 +2,105 @@
 import os
 
 SECRET_KEY = os.urandom(24)
-SQLALCHEMY_DATABASE_URI = 'sqlite:///task_manager.db'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///task_manager.db')
 TEMPLATES_AUTO_RELOAD = True
+
+# Connection pool used by the single application engine (see database.py)
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))
+DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 10))
+DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 30))
+DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 3600))
+
+# SQLite pragmas applied to every new connection (see database.py). In WAL mode
+# readers are not blocked by a committing writer, and synchronous=NORMAL only
+# risks losing the last commits on power loss, never corrupting the database.
+SQLITE_PRAGMA_PROFILES = {
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,  # Negative values are in KiB: 64 MB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # WAL with an fsync on every commit
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # SQLite's own defaults (rollback journal)
+    'default': {},
+}
+SQLITE_PRAGMA_PROFILE = os.environ.get('SQLITE_PRAGMA_PROFILE', 'wal')
+
+# Daily due-date notification job (see notifications.py)
+NOTIFICATION_SCHEDULER_ENABLED = os.environ.get('NOTIFICATION_SCHEDULER_ENABLED', '1') == '1'
+NOTIFICATION_RUN_HOUR = int(os.environ.get('NOTIFICATION_RUN_HOUR', 0))
+DASHBOARD_NOTIFICATION_LIMIT = 50
+
+# Background queue for non-critical writes (see write_behind.py)
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', '1') == '1'
+WRITE_BEHIND_CAPACITY = 10000
+WRITE_BEHIND_BATCH_SIZE = 200
+WRITE_BEHIND_POLL_SECONDS = 1
+
+# Keyset pagination for list pages (see pagination.py)
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Maximum number of SQL statements per request; set in test runs to catch N+1
+# regressions (see query_stats.py). None disables the check.
+QUERY_BUDGET = int(os.environ['QUERY_BUDGET']) if os.environ.get('QUERY_BUDGET') else None
+
+# Per-request SQL timing (see query_stats.py). Statements slower than the
+# threshold are logged; the slowest few of each request go in Server-Timing.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOWEST_QUERIES_KEPT = 3
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '1') == '1'
+
+# Upper bounds in seconds of the request latency histogram buckets (see metrics.py)
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Logging (see app_logging.py). LOG_FORMAT is 'json' or 'text'. Records below
+# WARNING are kept at the given rate per logger (and its children).
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = 10000
+LOG_SAMPLE_RATES = {'app': 0.1}
+
+# Logged-in users cached by the Flask-Login user loader (see user_cache.py)
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 10000
+
+# Password hashing (see passwords.py). Hashes made with another cost are
+# upgraded on the user's next login. At most BCRYPT_WORKERS hashes run at once,
+# BCRYPT_QUEUE_LIMIT more may wait up to BCRYPT_WAIT_TIMEOUT seconds.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+BCRYPT_QUEUE_LIMIT = 32
+BCRYPT_WAIT_TIMEOUT = 5
+
+# Cache lifetime of rendered chart images; their file names change with their data
+CHART_MAX_AGE = 365 * 24 * 3600
+
+# HTTP caching by endpoint (see http_cache.py); unlisted endpoints are sent
+# with no-store. 'etag' pages are revalidated against a data version kept in
+# the database, so every worker process agrees on it.
+CACHE_POLICIES = {
+    'static': 'static',
+    'serve_chart': 'view',
+    'index': 'etag',
+    'show_tasks': 'etag',
+    'projects': 'etag',
+    'teams': 'etag',
+    'show_workers': 'etag',
+    'manage_workers': 'etag',
+    'worker_performance': 'etag',
+    'worker_performance_departments': 'etag',
+}
+# Cache lifetime of fingerprinted static files (static_url)
+STATIC_MAX_AGE = 365 * 24 * 3600
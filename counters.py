@@ -0,0 +1,156 @@
+import logging
+
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.exc import OperationalError
+
+from models import User, Task, TaskStatus, user_task_association
+from helper import priority_weight_expression
+
+logger = logging.getLogger(__name__)
+
+# Status that earns the assignees completion credit
+COMPLETED_STATUS = TaskStatus.COMPLETED
+
+COUNTER_TRIGGERS = ['user_task_counters_insert', 'user_task_counters_delete', 'task_counters_update', 'task_counters_delete']
+
+
+def _weight(priority):
+    # Same as helper.priority_weight_expression
+    return f"coalesce({priority}, 0)"
+
+
+def _completed(status):
+    return f"(CASE WHEN {status} = {int(COMPLETED_STATUS)} THEN 1 ELSE 0 END)"
+
+
+def _apply_assignment(sign, row):
+    # Add (sign '+') or remove (sign '-') one assignment to the user's counters
+    task = f"FROM tasks WHERE tasks.id = {row}.task_id"
+    return f"""
+        UPDATE users SET
+            task_number = coalesce(task_number, 0) {sign} 1,
+            task_priority = coalesce(task_priority, 0) {sign}
+                coalesce((SELECT {_weight('tasks.priority')} {task}), 0),
+            completed_task_number = coalesce(completed_task_number, 0) {sign}
+                coalesce((SELECT {_completed('tasks.status')} {task}), 0),
+            completed_task_priority = coalesce(completed_task_priority, 0) {sign}
+                coalesce((SELECT {_completed('tasks.status')} * {_weight('tasks.priority')} {task}), 0)
+        WHERE id = {row}.user_id;
+    """
+
+
+# The users' workload counters are derived from user_task_association and the
+# tasks' priority and status. Triggers keep them in sync on every write path,
+# including the bulk inserts in assignments.py and teams.py.
+COUNTER_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS user_task_counters_insert AFTER INSERT ON user_task_association BEGIN
+        {_apply_assignment('+', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS user_task_counters_delete AFTER DELETE ON user_task_association BEGIN
+        {_apply_assignment('-', 'old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_counters_update AFTER UPDATE OF priority, status ON tasks BEGIN
+        UPDATE users SET
+            task_priority = coalesce(task_priority, 0)
+                + {_weight('new.priority')} - {_weight('old.priority')},
+            completed_task_number = coalesce(completed_task_number, 0)
+                + {_completed('new.status')} - {_completed('old.status')},
+            completed_task_priority = coalesce(completed_task_priority, 0)
+                + {_completed('new.status')} * {_weight('new.priority')}
+                - {_completed('old.status')} * {_weight('old.priority')}
+        WHERE id IN (SELECT user_id FROM user_task_association WHERE task_id = new.id);
+    END
+    """,
+    # Drop the assignments of a deleted task so its assignees lose the credit
+    """
+    CREATE TRIGGER IF NOT EXISTS task_counters_delete BEFORE DELETE ON tasks BEGIN
+        DELETE FROM user_task_association WHERE task_id = old.id;
+    END
+    """,
+]
+
+
+def init_counters(engine):
+    """
+    Create the counter triggers if they don't exist yet. Counters are rebuilt
+    when the triggers are first created, as earlier writes were not tracked.
+    """
+    if engine.dialect.name != 'sqlite':
+        logger.warning("Workload counter triggers need SQLite; run recompute-counters after writes")
+        return
+
+    with engine.begin() as connection:
+        existing = {
+            row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))
+        }
+        if all(name in existing for name in COUNTER_TRIGGERS):
+            return
+        try:
+            for statement in COUNTER_DDL:
+                connection.execute(text(statement))
+        except OperationalError as error:
+            logger.warning("Workload counter triggers unavailable: %s", error)
+            return
+        for statement in _recompute_statements():
+            connection.execute(statement)
+
+
+def _totals():
+    # One grouped pass over user_task_association for every user's counters
+    weight = priority_weight_expression(Task.priority)
+    completed = case((Task.status == COMPLETED_STATUS, 1), else_=0)
+    return select(
+        user_task_association.c.user_id,
+        func.count().label('task_number'),
+        func.sum(weight).label('task_priority'),
+        func.sum(completed).label('completed_task_number'),
+        func.sum(completed * weight).label('completed_task_priority'),
+    ).join(Task, Task.id == user_task_association.c.task_id).group_by(user_task_association.c.user_id).subquery()
+
+
+def _recompute_statements():
+    totals = _totals()
+    reset = update(User).values(task_number=0, task_priority=0, completed_task_number=0, completed_task_priority=0)
+    fill = update(User).where(User.id == totals.c.user_id).values(
+        task_number=totals.c.task_number,
+        task_priority=totals.c.task_priority,
+        completed_task_number=totals.c.completed_task_number,
+        completed_task_priority=totals.c.completed_task_priority,
+    )
+    return reset, fill
+
+
+def counter_drift(session):
+    """
+    Return (user_id, stored counters, actual counters) for every user whose
+    stored workload counters differ from user_task_association.
+    """
+    totals = _totals()
+    columns = ['task_number', 'task_priority', 'completed_task_number', 'completed_task_priority']
+    rows = session.execute(
+        select(
+            User.id,
+            *[func.coalesce(getattr(User, name), 0) for name in columns],
+            *[func.coalesce(totals.c[name], 0) for name in columns],
+        ).outerjoin(totals, totals.c.user_id == User.id).order_by(User.id)
+    )
+    drift = []
+    for row in rows:
+        stored, actual = tuple(row[1:5]), tuple(row[5:9])
+        if stored != actual:
+            drift.append((row[0], stored, actual))
+    return drift
+
+
+def recompute_counters(session):
+    """
+    Rebuild every user's workload counters from user_task_association with
+    one grouped query. The caller commits.
+    """
+    for statement in _recompute_statements():
+        session.execute(statement.execution_options(synchronize_session=False))
@@ -1,20 +1,81 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import re
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 from models import Base
+from search import init_task_search
+from counters import init_counters
+import config
+
+engine = None  # Global engine, built once at application startup
+
+# Thread-local session registry. Each request gets its own Session (and its own
+# identity map), which is discarded by session.remove() in the app teardown.
+session = scoped_session(sessionmaker())
 
-# Import all your models individually
-from models import User, UserInfo, Project, Task, Comment, Notification
+def apply_sqlite_pragmas(engine, pragmas):
+    """
+    Run "PRAGMA name = value" for each of pragmas on every new connection.
+    """
+    # Pragmas take no bound parameters, so names and values are checked instead
+    for name, value in pragmas.items():
+        if not re.fullmatch(r'[a-z_]+', name) or not re.fullmatch(r'-?[A-Za-z0-9_]+', str(value)):
+            raise ValueError(f"Invalid SQLite pragma {name} = {value!r}")
 
-session = None  # Global variable to store the session
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+def create_database_engine(database_url, pragma_profile=None):
+    """
+    Build an engine with the connection pool settings from config. SQLite
+    connections get the pragmas of pragma_profile (config.SQLITE_PRAGMA_PROFILE
+    by default).
+    """
+    # sqlite3 connections are shared between the pool's threads
+    connect_args = {}
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        connect_args = {"check_same_thread": False}
+
+    engine = create_engine(
+        database_url,
+        poolclass=QueuePool,
+        pool_size=config.DATABASE_POOL_SIZE,
+        max_overflow=config.DATABASE_MAX_OVERFLOW,
+        pool_timeout=config.DATABASE_POOL_TIMEOUT,
+        pool_recycle=config.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+    if engine.dialect.name == 'sqlite':
+        profile = pragma_profile or config.SQLITE_PRAGMA_PROFILE
+        apply_sqlite_pragmas(engine, config.SQLITE_PRAGMA_PROFILES[profile])
+    return engine
 
 def init_database(database_url):
-    global session  # Access the global session variable
-    engine = create_engine(database_url)
-    Base.metadata.create_all(bind=engine)
-    Session = sessionmaker(bind=engine)
+    global engine  # Access the global engine variable
 
-    # Check if the session is already initialized
-    if session is None:
-        session = Session()
+    # Check if the engine is already initialized
+    if engine is None:
+        engine = create_database_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        init_task_search(engine)
+        init_counters(engine)
+        session.configure(bind=engine)
 
     return session
+
+def remove_session(exception=None):
+    """
+    Close the current thread's session and return its connection to the pool.
+    """
+    if exception is not None:
+        session.rollback()
+    session.remove()
@@ -1,9 +1,27 @@
-def calculate_user_task_priority(priority):
-    if priority == 'high':
-        return 3
-    elif priority == 'medium':
-        return 2
-    elif priority == 'low':
-        return 1
-    else:
-        return 0  # Default value if priority is not recognized
+from sqlalchemy import Integer, func, type_coerce
+
+
+def priority_weight_expression(priority_column):
+    """
+    SQL expression for the weight of a task priority in the users' task_priority
+    counters. Priority codes are their own weights (see models.TaskPriority).
+    """
+    # Plain integers, so sums of weights are not read back as priorities
+    return func.coalesce(type_coerce(priority_column, Integer), 0)
+
+
+def parse_tag_names(tags):
+    """
+    Split a comma-separated tag string (or a list of names) into unique, normalized tag names.
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+
+    names = []
+    for name in tags:
+        name = name.strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names
@@ -0,0 +1,152 @@
+import hashlib
+import os
+from datetime import date
+
+from flask import Response, current_app, g, request, session as flask_session, url_for
+from flask_login import current_user
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from database import session
+from models import DataVersion
+import config
+
+# Statements that change data; anything else doesn't move the data version
+_WRITE_KEYWORDS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+# The data version lives in the database so that every worker process sees the
+# writes of the others. It is bumped inside the committing transaction, so the
+# new version becomes visible together with the data it describes.
+_BUMP_DATA_VERSION = (
+    "INSERT INTO data_version (id, version) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1"
+)
+
+# Part of every ETag, so tags handed out before a deploy never match. Set by
+# init_http_cache from the code and templates, so all workers of a deploy agree.
+_build_token = ''
+_fingerprints = {}
+
+
+def data_version():
+    return session.execute(select(DataVersion.version)).scalar() or 0
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def mark_data_changed(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:7].upper().startswith(_WRITE_KEYWORDS):
+        conn.info['data_changed'] = True
+
+
+@event.listens_for(Engine, 'commit')
+def bump_data_version(conn):
+    # Runs just before the COMMIT. The DBAPI cursor bypasses the engine events,
+    # so the bump itself doesn't count as a change.
+    if conn.info.pop('data_changed', False):
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(_BUMP_DATA_VERSION)
+        finally:
+            cursor.close()
+
+
+@event.listens_for(Engine, 'rollback')
+def discard_data_changed(conn):
+    conn.info.pop('data_changed', None)
+
+
+def _compute_build_token(app):
+    digest = hashlib.sha256()
+    for directory in (app.root_path, os.path.join(app.root_path, app.template_folder)):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.py', '.html')):
+                digest.update(f'{name}:{os.path.getmtime(os.path.join(directory, name))}'.encode())
+    return digest.hexdigest()[:8]
+
+
+def static_url(filename):
+    """
+    URL of a static file with a fingerprint of its content, so it can be
+    cached for good: the URL changes whenever the file does.
+    """
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return url_for('static', filename=filename)
+    cached = _fingerprints.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as static_file:
+            cached = (mtime, hashlib.sha256(static_file.read()).hexdigest()[:12])
+        _fingerprints[filename] = cached
+    return url_for('static', filename=filename, v=cached[1])
+
+
+def _page_etag():
+    user_id = current_user.get_id() if current_user.is_authenticated else 'anonymous'
+    # The date is part of the tag as pages like show_tasks?due_within= change at midnight
+    return f'{_build_token}-{g.data_version}-{date.today().isoformat()}-{user_id}'
+
+
+def _policy():
+    if request.method not in ('GET', 'HEAD'):
+        return 'no-store'
+    return config.CACHE_POLICIES.get(request.endpoint, 'no-store')
+
+
+def init_http_cache(app):
+    """
+    Apply the per-endpoint cache policies of config.CACHE_POLICIES:
+
+    'static'  fingerprinted URLs (?v=) are cached for a year, others revalidate
+    'view'    the view sets its own caching headers
+    'etag'    a weak ETag from the data version, the date and the user; an
+              unchanged page is answered with 304 before the view runs
+    other endpoints are not cached at all.
+    """
+    global _build_token
+
+    _build_token = _compute_build_token(app)
+    app.jinja_env.globals['static_url'] = static_url
+
+    @app.before_request
+    def answer_not_modified():
+        if _policy() != 'etag':
+            return None
+
+        g.data_version = data_version()
+        # A pending flash message must be rendered by the view
+        if '_flashes' in flask_session:
+            g.skip_etag = True
+            return None
+
+        etag = _page_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        return None
+
+    @app.after_request
+    def set_cache_headers(response):
+        policy = _policy()
+        if policy == 'view':
+            return response
+
+        if policy == 'static':
+            if 'v' in request.args:
+                response.headers['Cache-Control'] = f'public, max-age={config.STATIC_MAX_AGE}, immutable'
+            else:
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        if policy == 'etag' and 'data_version' in g and response.status_code in (200, 304) and not g.get('skip_etag'):
+            response.set_etag(_page_etag(), weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response.headers['Expires'] = 0
+        response.headers['Pragma'] = 'no-cache'
+        return response
@@ -0,0 +1,205 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+import config
+
+# Prometheus text exposition format, without the client library
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        # For totals counted elsewhere and copied in by a collector
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=config.METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = sorted(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float('inf')], counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {total!r}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def register_collector(collect):
+    """
+    Register a function called on every scrape to refresh metrics whose values
+    live elsewhere (pool stats, queue depth, write-behind job counts).
+    """
+    _collectors.append(collect)
+
+
+def render_metrics():
+    for collect in _collectors:
+        collect()
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time spent serving requests, by endpoint.', ['endpoint'],
+)
+REQUESTS = Counter('http_requests_total', 'Requests served, by endpoint and status code.', ['endpoint', 'status'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being served.')
+NOTIFICATIONS_CREATED = Counter('notifications_created_total', 'Due-date notifications created.')
+NOTIFICATIONS_DELIVERED = Counter('notifications_delivered_total', 'Due-date notifications delivered to users.')
+CHARTS = Counter('charts_total', 'Chart requests, by whether the image was rendered or reused.', ['result'])
+DB_POOL = Gauge('db_pool_connections', 'Database pool connections, by state.', ['state'])
+WRITE_BEHIND_DEPTH = Gauge('write_behind_queue_depth', 'Jobs waiting in the write-behind queue.')
+WRITE_BEHIND_JOBS = Counter('write_behind_jobs_total', 'Write-behind jobs, by outcome.', ['outcome'])
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log records dropped because the log queue was full.')
+
+
+def _collect_pool():
+    import database
+
+    pool = database.engine.pool if database.engine is not None else None
+    if pool is None or not hasattr(pool, 'checkedout'):
+        return
+    DB_POOL.set(pool.size(), state='size')
+    DB_POOL.set(pool.checkedin(), state='idle')
+    DB_POOL.set(pool.checkedout(), state='checked_out')
+    DB_POOL.set(max(pool.overflow(), 0), state='overflow')
+
+
+def _collect_write_behind():
+    from write_behind import write_behind_stats
+
+    stats = write_behind_stats()
+    WRITE_BEHIND_DEPTH.set(stats['depth'])
+    for outcome in ('enqueued', 'processed', 'failed', 'dropped'):
+        WRITE_BEHIND_JOBS.set(stats[outcome], outcome=outcome)
+
+
+def _collect_logging():
+    from app_logging import DroppingQueueHandler
+
+    LOG_RECORDS_DROPPED.set(DroppingQueueHandler.dropped)
+
+
+register_collector(_collect_pool)
+register_collector(_collect_write_behind)
+register_collector(_collect_logging)
+
+
+def init_metrics(app):
+    """
+    Record per-endpoint latency and in-flight requests, and serve every
+    metric at /metrics in Prometheus text format.
+    """
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_start = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' in g:
+            # Unrouted requests share one label so stray URLs don't add series
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - g.metrics_start, endpoint=endpoint)
+            REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_metrics_timer(exception=None):
+        if g.pop('metrics_start', None) is not None:
+            IN_FLIGHT.dec()
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), content_type=CONTENT_TYPE)
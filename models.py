@@ -1,67 +1,159 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Date, Boolean, DateTime, Table, event
-from sqlalchemy.orm import relationship, declarative_base, object_session
+import enum
+
+from sqlalchemy import Column, ForeignKey, Integer, String, Date, Boolean, DateTime, Table, Index, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import relationship, declarative_base, object_session, Session
 from sqlalchemy.orm.attributes import set_committed_value
 from flask_login import UserMixin
 from datetime import datetime, date
-from helper import calculate_user_task_priority
+from helper import parse_tag_names
 
-"""import logging
-import sys
+Base = declarative_base()
+today = date.today()
 
-logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logging.getLogger('sqlalchemy.engine').addHandler(handler)
-"""
+class LabeledIntEnum(enum.IntEnum):
+    """
+    Integer-coded choice with a display label derived from its name.
+    """
+
+    @property
+    def label(self):
+        return self.name.replace('_', ' ').title()
+
+    @classmethod
+    def coerce(cls, value):
+        """
+        Accept a member, its integer code (or its string form) or its label.
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            value = value.strip()
+            if not value.isdigit():
+                for member in cls:
+                    if value.lower() in (member.label.lower(), member.name.lower()):
+                        return member
+                raise ValueError(f"{value!r} is not a valid {cls.__name__}")
+        return cls(int(value))
+
+
+class TaskPriority(LabeledIntEnum):
+    """
+    The codes double as the priority weights of the users' workload counters,
+    so priorities sort and sum in SQL without a lookup table.
+    """
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+
+
+class TaskStatus(LabeledIntEnum):
+    NOT_STARTED = 1
+    IN_PROGRESS = 2
+    COMPLETED = 3
+    ON_HOLD = 4
+    CANCELLED = 5
+    PENDING_REVIEW = 6
+    BLOCKED = 7
+    DEFERRED = 8
+
+
+# Statuses of tasks that still need work
+OPEN_TASK_STATUSES = [
+    status for status in TaskStatus if status not in (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+]
+
+
+class IntEnumType(TypeDecorator):
+    """
+    Store a LabeledIntEnum as its integer code.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, enum_class):
+        super().__init__()
+        self.enum_class = enum_class
+
+    @property
+    def python_type(self):
+        return self.enum_class
+
+    def process_bind_param(self, value, dialect):
+        value = self.enum_class.coerce(value)
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.enum_class(value)
 
-Base = declarative_base()
-today = date.today()
 
 user_task_association = Table(
     'user_task_association',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True)
+    Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True),
+    # The primary key serves user -> tasks; this serves task -> users
+    Index('ix_user_task_association_task_user', 'task_id', 'user_id'),
 )
 
+# Association tables without a primary key get an index per join direction,
+# each covering both columns so joins never read the table itself
 task_notification_association = Table(
     'task_notification_association',
     Base.metadata,
     Column('task_id', Integer, ForeignKey('tasks.id')),
-    Column('notification_id', Integer, ForeignKey('notifications.id'))
+    Column('notification_id', Integer, ForeignKey('notifications.id')),
+    Index('ix_task_notification_association_task_notification', 'task_id', 'notification_id'),
+    Index('ix_task_notification_association_notification_task', 'notification_id', 'task_id'),
 )
 
 user_notification_association = Table(
     'user_notification_association',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('notification_id', Integer, ForeignKey('notifications.id'))
+    Column('notification_id', Integer, ForeignKey('notifications.id')),
+    Index('ix_user_notification_association_user_notification', 'user_id', 'notification_id'),
+    Index('ix_user_notification_association_notification_user', 'notification_id', 'user_id'),
 )
 project_task_association = Table(
     'project_task_association',
     Base.metadata,
     Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True),
-    Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True)
+    Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True),
+    Index('ix_project_task_association_task_project', 'task_id', 'project_id'),
 )
 team_user_association = Table(
     'team_user_association',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
     Column('team_id', Integer, ForeignKey('teams.id')),
+    Index('ix_team_user_association_team_user', 'team_id', 'user_id'),
+    Index('ix_team_user_association_user_team', 'user_id', 'team_id'),
 )
 team_task_association = Table(
     'team_task_association',
     Base.metadata,
     Column('task_id', Integer, ForeignKey('tasks.id')),
-    Column('team_id', Integer, ForeignKey('teams.id'))
+    Column('team_id', Integer, ForeignKey('teams.id')),
+    Index('ix_team_task_association_team_task', 'team_id', 'task_id'),
+    Index('ix_team_task_association_task_team', 'task_id', 'team_id'),
+)
+task_tag_association = Table(
+    'task_tag_association',
+    Base.metadata,
+    Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # Inverted index: tag -> tasks
+    Index('ix_task_tag_association_tag_task', 'tag_id', 'task_id'),
 )
 project_team_association = Table(
     'project_team_association',
     Base.metadata,
     Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True),
-    Column('team_id', Integer, ForeignKey('teams.id'), primary_key=True)
+    Column('team_id', Integer, ForeignKey('teams.id'), primary_key=True),
+    Index('ix_project_team_association_team_project', 'team_id', 'project_id'),
 )
 
 class User(Base, UserMixin):
@@ -101,7 +193,7 @@ class UserInfo(Base):
     __tablename__ = "user_info"
     id = Column(Integer, primary_key=True)
     user = relationship("User", back_populates="user_info")
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     full_name = Column(String(100))
     age = Column(Integer)
@@ -116,7 +208,7 @@ class Project(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     description = Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
 
     user = relationship('User', back_populates='projects')
     tasks = relationship("Task", secondary=project_task_association,back_populates ="associated_project")
@@ -136,12 +228,24 @@ class Task(Base):
     title = Column(String, nullable=False)
     description = Column(String)
     due_date = Column(Date)
-    priority = Column(Integer)
-    status = Column(String)
+    priority = Column(IntEnumType(TaskPriority))
+    status = Column(IntEnumType(TaskStatus))
     created_at = Column(DateTime, default=datetime.utcnow)
-    created_by = Column(Integer, ForeignKey('users.id'))
-    tags = Column(String)
-
+    created_by = Column(Integer, ForeignKey('users.id'), index=True)
+
+    creator = relationship('User', foreign_keys=[created_by])
+    tags = relationship('Tag', secondary=task_tag_association, back_populates='tasks', order_by='Tag.name')
+
+    # One index per /show_tasks sort key; the id makes the keyset order unique
+    __table_args__ = (
+        Index('ix_tasks_title_id', 'title', 'id'),
+        Index('ix_tasks_due_date_id', 'due_date', 'id'),
+        Index('ix_tasks_priority_id', 'priority', 'id'),
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        Index('ix_tasks_status_id', 'status', 'id'),
+        # "Open high-priority tasks due this week": status IN, priority =, due_date range
+        Index('ix_tasks_status_priority_due_date', 'status', 'priority', 'due_date'),
+    )
     assigned_teams = relationship('Team', secondary=team_task_association, back_populates='assigned_tasks')
     assigned_users = relationship('User', secondary=user_task_association, back_populates='assigned_tasks')
     comments = relationship("Comment", backref="task")
@@ -156,13 +260,81 @@ class Task(Base):
         self.priority = priority
         self.status = status
         self.created_by = created_by
-        self.tags = tags
+        self.tag_names = tags
 
     def days_left(self):
         today = date.today()
         delta = self.due_date - today
         return delta.days
 
+    @property
+    def tag_names(self):
+        """
+        The task's tags as a comma-separated string.
+        """
+        pending = getattr(self, '_pending_tag_names', None)
+        if pending is not None:
+            return ', '.join(pending)
+        return ', '.join(tag.name for tag in self.tags)
+
+    @tag_names.setter
+    def tag_names(self, tags):
+        names = parse_tag_names(tags)
+        session = object_session(self)
+        if session is None:
+            # Resolved against the tags table when the task is flushed
+            self._pending_tag_names = names
+        else:
+            self._pending_tag_names = None
+            self.tags = Tag.get_or_create(session, names)
+
+
+class Tag(Base):
+    __tablename__ = 'tags'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False, unique=True)
+
+    tasks = relationship('Task', secondary=task_tag_association, back_populates='tags')
+
+    def __init__(self, name):
+        self.name = name
+
+    @staticmethod
+    def get_or_create(session, names):
+        """
+        Return Tag objects for the given names, creating the missing ones.
+
+        Missing names are inserted right away with ON CONFLICT DO NOTHING and
+        selected again, so a request creating the same new tag at the same
+        time doesn't make this one fail on the unique name.
+        """
+        if not names:
+            return []
+
+        with session.no_autoflush:
+            existing = {tag.name: tag for tag in session.query(Tag).filter(Tag.name.in_(names))}
+            missing = [name for name in names if name not in existing]
+            if missing:
+                session.execute(
+                    sqlite_insert(Tag).on_conflict_do_nothing(index_elements=['name']),
+                    [{'name': name} for name in missing],
+                )
+                existing.update((tag.name, tag) for tag in session.query(Tag).filter(Tag.name.in_(missing)))
+
+        return [existing[name] for name in names]
+
+
+@event.listens_for(Session, 'before_flush')
+def resolve_pending_tags(session, flush_context, instances):
+    """
+    Attach Tag rows to new tasks that were created with a tag string.
+    """
+    for obj in list(session.new):
+        if isinstance(obj, Task) and getattr(obj, '_pending_tag_names', None) is not None:
+            obj.tags = Tag.get_or_create(session, obj._pending_tag_names)
+            obj._pending_tag_names = None
+
 
 
 class Comment(Base):
@@ -171,7 +343,7 @@ class Comment(Base):
     id = Column(Integer, primary_key=True)
     content = Column(String, nullable=False)
     timestamp = Column(String)
-    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False)
+    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False, index=True)
     author = Column(String, nullable=False)
 
     def __init__(self, content, author, task,timestamp=None):
@@ -189,10 +361,20 @@ class Notification(Base):
     content = Column(String, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     task_id = Column(Integer, ForeignKey('tasks.id'))
+    threshold_days = Column(Integer)
+    due_date = Column(Date)
+
+    task = relationship('Task')
 
-    def __init__(self, task, content):
+    __table_args__ = (
+        Index('ix_notifications_task_threshold', 'task_id', 'threshold_days', 'due_date', unique=True),
+    )
+
+    def __init__(self, task, content, threshold_days=None, due_date=None):
         self.content = content
         self.task = task
+        self.threshold_days = threshold_days
+        self.due_date = due_date
 
 class Attachment(Base):
     __tablename__ = 'attachments'
@@ -200,7 +382,7 @@ class Attachment(Base):
     id = Column(Integer, primary_key=True)
     filename = Column(String)
     filepath = Column(String)
-    task_id = Column(Integer, ForeignKey('tasks.id'))
+    task_id = Column(Integer, ForeignKey('tasks.id'), index=True)
 
     def __init__(self, filename, filepath):
         self.filename = filename
@@ -230,6 +412,16 @@ class TeamMemberRole(Base):
     id = Column(Integer, primary_key=True)
     role = Column(String, nullable=False)
 
-    user_id = Column(Integer, ForeignKey('users.id'))
-    team_id = Column(Integer, ForeignKey('teams.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), index=True)
 
+
+class DataVersion(Base):
+    """
+    A single row counting the commits that changed data, shared by every
+    process so their page ETags agree (see http_cache.py).
+    """
+    __tablename__ = 'data_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
@@ -0,0 +1,136 @@
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+
+from models import Task, Notification, user_task_association, user_notification_association
+from database import session
+from metrics import NOTIFICATIONS_CREATED, NOTIFICATIONS_DELIVERED
+import write_behind
+import config
+
+logger = logging.getLogger(__name__)
+
+# Days before the due date at which a reminder is sent, with its message
+NOTIFICATION_THRESHOLDS = {
+    1: "Task '{title}' is due tomorrow!",
+    3: "Task '{title}' is due in 3 days.",
+    7: "Task '{title}' is due in 7 days.",
+}
+
+_stop_event = threading.Event()
+_scheduler_thread = None
+
+
+def generate_due_date_notifications(today=None, task_ids=None):
+    """
+    Deliver and commit the due-date reminders for today (see
+    deliver_due_date_notifications). Returns the number delivered.
+    """
+    delivered = deliver_due_date_notifications(today, task_ids)
+    session.commit()
+    return delivered
+
+
+def deliver_due_date_notifications(today=None, task_ids=None):
+    """
+    Create due-date reminders for tasks that are exactly 1, 3 or 7 days away
+    and deliver them to the users assigned to each task.
+
+    A notification is stored once per (task, threshold, due date) and linked to
+    each assignee at most once, so running this repeatedly is harmless.
+    Returns the number of user notifications delivered. The caller commits.
+    """
+    if today is None:
+        today = date.today()
+
+    delivered = 0
+    for days, template in NOTIFICATION_THRESHOLDS.items():
+        due_date = today + timedelta(days=days)
+
+        tasks = session.query(Task).filter(Task.due_date == due_date)
+        if task_ids is not None:
+            tasks = tasks.filter(Task.id.in_(task_ids))
+
+        for task in tasks.all():
+            notification = session.query(Notification).filter_by(
+                task_id=task.id, threshold_days=days, due_date=due_date
+            ).first()
+            if notification is None:
+                notification = Notification(
+                    task=task,
+                    content=template.format(title=task.title),
+                    threshold_days=days,
+                    due_date=due_date,
+                )
+                session.add(notification)
+                session.flush()
+                NOTIFICATIONS_CREATED.inc()
+
+            # Assignees of the task who have not received this notification yet
+            already_notified = session.query(user_notification_association.c.user_id).filter(
+                user_notification_association.c.notification_id == notification.id
+            )
+            recipients = session.query(user_task_association.c.user_id).filter(
+                user_task_association.c.task_id == task.id,
+                user_task_association.c.user_id.notin_(already_notified),
+            ).all()
+
+            if recipients:
+                session.execute(
+                    user_notification_association.insert(),
+                    [{'user_id': user_id, 'notification_id': notification.id} for (user_id,) in recipients],
+                )
+                delivered += len(recipients)
+                NOTIFICATIONS_DELIVERED.inc(len(recipients))
+
+    return delivered
+
+
+def notify_due_date_change(task):
+    """
+    Re-evaluate reminders for a single task after its due date was set or
+    changed. The fan-out runs on the write-behind thread, after the request.
+    """
+    return write_behind.enqueue(deliver_due_date_notifications, None, [task.id])
+
+
+def _seconds_until_next_run(now=None):
+    if now is None:
+        now = datetime.now()
+    next_run = datetime.combine(now.date(), time(hour=config.NOTIFICATION_RUN_HOUR))
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _run_scheduler():
+    while not _stop_event.is_set():
+        try:
+            delivered = generate_due_date_notifications()
+            logger.info("Delivered %d due-date notifications", delivered)
+        except Exception:
+            logger.exception("Due-date notification run failed")
+            session.rollback()
+        finally:
+            session.remove()
+
+        _stop_event.wait(_seconds_until_next_run())
+
+
+def start_notification_scheduler():
+    """
+    Start the daily due-date notification job in a background thread.
+    """
+    global _scheduler_thread
+
+    if _scheduler_thread is not None and _scheduler_thread.is_alive():
+        return _scheduler_thread
+
+    _stop_event.clear()
+    _scheduler_thread = threading.Thread(target=_run_scheduler, name='notification-scheduler', daemon=True)
+    _scheduler_thread.start()
+    return _scheduler_thread
+
+
+def stop_notification_scheduler():
+    _stop_event.set()
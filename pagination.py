@@ -0,0 +1,224 @@
+import base64
+import binascii
+import enum
+import json
+from datetime import date, datetime
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import and_, or_
+
+import config
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(key):
+    """
+    Turn a (sort value, id) pair into an opaque URL-safe token.
+    """
+    data = json.dumps(list(key), default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_column):
+    """
+    Turn a token back into a (sort value, id) pair, or None if it is invalid.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = int(last_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    # Only JSON scalars can be compared with a column (bool is an int too)
+    if value is not None and (not isinstance(value, (str, int, float)) or isinstance(value, bool)):
+        return None
+
+    if value is not None and sort_column is not None:
+        try:
+            python_type = sort_column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        try:
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            elif python_type in (int, float):
+                value = python_type(value)
+            elif python_type is not None and issubclass(python_type, enum.IntEnum):
+                # Integer-coded enum columns (task priority and status)
+                value = python_type(value)
+        except (ValueError, TypeError):
+            return None
+    return value, last_id
+
+
+def _seek_segments(sort_column, id_column, value, last_id, greater):
+    """
+    Keyset predicates selecting the rows that come after (sort value, id) in
+    ascending order when greater is True, or in descending order otherwise.
+
+    SQLite orders NULLs first. Mixing "IS NULL" into the range predicate stops
+    SQLite from seeking the index, so NULL rows are returned as a separate
+    segment that is only queried when the first one runs out.
+    """
+    if sort_column is None:
+        return [id_column > last_id if greater else id_column < last_id]
+
+    nullable = getattr(getattr(sort_column, 'expression', sort_column), 'nullable', True)
+    if greater:
+        if value is None:
+            return [and_(sort_column.is_(None), id_column > last_id), sort_column.isnot(None)]
+        return [or_(sort_column > value, and_(sort_column == value, id_column > last_id))]
+
+    if value is None:
+        return [and_(sort_column.is_(None), id_column < last_id)]
+    segments = [or_(sort_column < value, and_(sort_column == value, id_column < last_id))]
+    if nullable:
+        segments.append(sort_column.is_(None))
+    return segments
+
+
+def _ordered(query, id_column, sort_column=None, reverse=False):
+    """
+    Select the key columns alongside the entity and order by them. Selecting
+    them lets the cursor be built even when the sort column is not an
+    attribute of the entity (e.g. FTS rank).
+    """
+    key_columns = [id_column] if sort_column is None else [sort_column, id_column]
+    return query.add_columns(*key_columns).order_by(None).order_by(
+        *[column.desc() if reverse else column.asc() for column in key_columns]
+    )
+
+
+def get_page_size():
+    """
+    Read the page size from the query string, clamped to config.MAX_PAGE_SIZE.
+    """
+    page_size = request.args.get('page_size', type=int) or config.PAGE_SIZE
+    return max(1, min(page_size, config.MAX_PAGE_SIZE))
+
+
+class Page:
+    """
+    One page of a keyset-paginated query, with cursors for its neighbours.
+    """
+
+    def __init__(self, items, next_cursor, prev_cursor, prefix=''):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.prefix = prefix
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def _url(self, arg, cursor):
+        # Keep the other query parameters (filters, sort, other lists' cursors)
+        args = [(key, value) for key, value in request.args.items(multi=True)
+                if key not in (self.prefix + 'after', self.prefix + 'before')]
+        args.append((self.prefix + arg, cursor))
+        return request.path + '?' + urlencode(args)
+
+    @property
+    def next_url(self):
+        return self._url('after', self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self._url('before', self.prev_cursor) if self.has_prev else None
+
+
+def paginate(query, id_column, sort_column=None, descending=False, prefix='', page_size=None):
+    """
+    Return one Page of query ordered by (sort_column, id_column).
+
+    The position is read from the '<prefix>after' / '<prefix>before' query
+    string cursors, so each page is a range seek on the sort index instead of
+    an OFFSET scan. A prefix lets one view paginate several lists.
+    """
+    if page_size is None:
+        page_size = get_page_size()
+
+    after = request.args.get(prefix + 'after')
+    before = request.args.get(prefix + 'before')
+    cursor = decode_cursor(before or after, sort_column) if (before or after) else None
+    backwards = cursor is not None and bool(before)
+
+    reverse = descending != backwards
+    query = _ordered(query, id_column, sort_column, reverse)
+
+    if cursor is None:
+        rows = query.limit(page_size + 1).all()
+    else:
+        greater = descending if backwards else not descending
+        rows = []
+        for segment in _seek_segments(sort_column, id_column, cursor[0], cursor[1], greater):
+            rows += query.filter(segment).limit(page_size + 1 - len(rows)).all()
+            if len(rows) > page_size:
+                break
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def key(row):
+        return (None, row[-1]) if sort_column is None else (row[-2], row[-1])
+
+    items = [row[0] for row in rows]
+    first = encode_cursor(key(rows[0])) if rows else None
+    last = encode_cursor(key(rows[-1])) if rows else None
+
+    if backwards:
+        next_cursor = last
+        prev_cursor = first if has_more else None
+    else:
+        next_cursor = last if has_more else None
+        prev_cursor = first if cursor is not None else None
+
+    return Page(items, next_cursor, prev_cursor, prefix)
+
+
+def explain_sort(session, query, id_column, sort_column, sample_value, page_size=None):
+    """
+    Return the SQLite query plans of the first page and of a seek page of
+    query ordered by sort_column, and whether both are served by an index
+    (no full scan and no temporary B-tree for the ORDER BY).
+    """
+    if page_size is None:
+        page_size = config.PAGE_SIZE
+
+    first_page = _ordered(query, id_column, sort_column).limit(page_size + 1)
+    seek_page = _ordered(query, id_column, sort_column).filter(
+        _seek_segments(sort_column, id_column, sample_value, 0, True)[0]
+    ).limit(page_size + 1)
+
+    connection = session.connection()
+    plans = []
+    for statement in (first_page, seek_page):
+        sql = statement.statement.compile(bind=connection, compile_kwargs={'literal_binds': True})
+        plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        plans.append(plan)
+
+    uses_index = all(
+        any('USING INDEX' in line or 'USING INTEGER PRIMARY KEY' in line or 'USING COVERING INDEX' in line for line in plan)
+        and not any('USE TEMP B-TREE' in line for line in plan)
+        for plan in plans
+    )
+    return uses_index, plans
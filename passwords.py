@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_bcrypt import Bcrypt
+
+import config
+
+# Bcrypt hashing is CPU-bound (the bcrypt library releases the GIL while it
+# runs). It runs on a small pool so a burst of logins can use at most
+# BCRYPT_WORKERS cores, and requests beyond the queue limit are turned away
+# instead of piling up behind it.
+bcrypt = Bcrypt()
+_executor = ThreadPoolExecutor(max_workers=config.BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+_slots = threading.BoundedSemaphore(config.BCRYPT_WORKERS + config.BCRYPT_QUEUE_LIMIT)
+
+
+class PasswordHashingBusy(Exception):
+    """
+    Raised when no bcrypt worker became available within BCRYPT_WAIT_TIMEOUT.
+    """
+
+
+def init_passwords(app):
+    bcrypt.init_app(app)
+
+
+def _run(function, *args):
+    if not _slots.acquire(timeout=config.BCRYPT_WAIT_TIMEOUT):
+        raise PasswordHashingBusy()
+    try:
+        return _executor.submit(function, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """
+    Hash a password with the configured cost (config.BCRYPT_ROUNDS).
+    """
+    return _run(bcrypt.generate_password_hash, password, config.BCRYPT_ROUNDS).decode('utf-8')
+
+
+def check_password(password_hash, password):
+    try:
+        return _run(bcrypt.check_password_hash, password_hash, password)
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def hash_rounds(password_hash):
+    """
+    Return the cost a bcrypt hash ('$2b$<cost>$...') was made with, or None
+    if it is not a bcrypt hash.
+    """
+    parts = password_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash):
+    return hash_rounds(password_hash) != config.BCRYPT_ROUNDS
@@ -0,0 +1,78 @@
+from sqlalchemy import Float, Integer, case, cast, func, select
+
+from models import User, UserInfo
+
+# Completion rate histogram: rates are split into this many equal-width bins
+DISTRIBUTION_BINS = 4
+
+UNASSIGNED_DEPARTMENT = 'Unassigned'
+
+
+def _completion_rate():
+    return cast(User.completed_task_number, Float) / User.task_number
+
+
+def _workers():
+    return select().select_from(User).join(UserInfo, UserInfo.user_id == User.id)
+
+
+def department_performance(session):
+    """
+    Aggregate worker completion rates per department in SQL.
+
+    For every department this returns the number of workers, the mean and
+    median completion rate of the workers that have tasks, a histogram of
+    those rates, the overall rate (completed tasks / tasks) and the
+    priority-weighted rate (completed_task_priority / task_priority).
+    """
+    has_tasks = User.task_number > 0
+
+    summary = _workers().add_columns(
+        UserInfo.department,
+        func.count(User.id),
+        func.count(case((has_tasks, 1))),
+        func.avg(case((has_tasks, _completion_rate()))),
+        func.coalesce(func.sum(User.completed_task_number), 0),
+        func.coalesce(func.sum(User.task_number), 0),
+        func.coalesce(func.sum(User.completed_task_priority), 0),
+        func.coalesce(func.sum(User.task_priority), 0),
+    ).group_by(UserInfo.department).order_by(UserInfo.department)
+
+    # Median: average of the middle one or two rates of each department
+    ranked = _workers().add_columns(
+        UserInfo.department.label('department'),
+        _completion_rate().label('rate'),
+        func.row_number().over(partition_by=UserInfo.department, order_by=_completion_rate()).label('position'),
+        func.count().over(partition_by=UserInfo.department).label('size'),
+    ).where(has_tasks).subquery()
+    medians = select(ranked.c.department, func.avg(ranked.c.rate)).where(
+        ranked.c.position.in_([cast((ranked.c.size + 1) / 2, Integer), cast((ranked.c.size + 2) / 2, Integer)])
+    ).group_by(ranked.c.department)
+
+    # Distribution: number of workers per completion rate bin
+    bucket = func.min(cast(_completion_rate() * DISTRIBUTION_BINS, Integer), DISTRIBUTION_BINS - 1)
+    distribution = _workers().add_columns(UserInfo.department, bucket.label('bucket'), func.count()).where(
+        has_tasks
+    ).group_by(UserInfo.department, 'bucket')
+
+    median_by_department = dict(session.execute(medians).all())
+    histogram_by_department = {}
+    for department, bin_index, count in session.execute(distribution):
+        histogram = histogram_by_department.setdefault(department, [0] * DISTRIBUTION_BINS)
+        histogram[bin_index] = count
+
+    results = []
+    for (department, workers, workers_with_tasks, mean_rate,
+         completed_tasks, tasks, completed_priority, priority) in session.execute(summary):
+        results.append({
+            'department': department or UNASSIGNED_DEPARTMENT,
+            'workers': workers,
+            'workers_with_tasks': workers_with_tasks,
+            'mean_rate': mean_rate or 0,
+            'median_rate': median_by_department.get(department) or 0,
+            'distribution': histogram_by_department.get(department, [0] * DISTRIBUTION_BINS),
+            'overall_rate': completed_tasks / tasks if tasks else 0,
+            'weighted_rate': completed_priority / priority if priority else 0,
+        })
+    return results
+
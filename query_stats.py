@@ -0,0 +1,110 @@
+import heapq
+import logging
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request issues more SQL statements than its query budget.
+    """
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+    # Only statements issued while serving a request are attributed to it
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def time_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+
+    endpoint = None
+    if has_request_context():
+        endpoint = request.endpoint
+        g.query_time = g.get('query_time', 0) + elapsed
+        # The slowest statements of the request, kept as a min-heap
+        slowest = g.setdefault('slowest_queries', [])
+        entry = (elapsed, len(slowest), statement)
+        if len(slowest) < config.SLOWEST_QUERIES_KEPT:
+            heapq.heappush(slowest, entry)
+        elif elapsed > slowest[0][0]:
+            heapq.heapreplace(slowest, entry)
+
+    if elapsed * 1000 >= config.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            "slow query endpoint=%s duration_ms=%.1f statement=%s",
+            endpoint, elapsed * 1000, ' '.join(statement.split()),
+            extra={'endpoint': endpoint, 'duration_ms': round(elapsed * 1000, 1), 'statement': statement},
+        )
+
+
+@event.listens_for(Engine, 'handle_error')
+def discard_query_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start_time'):
+        connection.info['query_start_time'].pop()
+
+
+def request_query_stats():
+    """
+    Return the query count, total DB time in seconds and the slowest
+    (seconds, statement) pairs of the current request.
+    """
+    slowest = sorted(g.get('slowest_queries', []), reverse=True)
+    return {
+        'count': g.get('query_count', 0),
+        'time': g.get('query_time', 0),
+        'slowest': [(elapsed, statement) for elapsed, _, statement in slowest],
+    }
+
+
+def init_query_stats(app):
+    """
+    Report each request's query count and DB time in a Server-Timing header,
+    with the durations of its slowest statements.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = request_query_stats()
+        logger.debug(
+            "request endpoint=%s queries=%d db_ms=%.1f", request.endpoint, stats['count'], stats['time'] * 1000,
+        )
+        if not config.SERVER_TIMING_ENABLED:
+            return response
+
+        metrics = [f'db;dur={stats["time"] * 1000:.1f};desc="{stats["count"]} queries"']
+        metrics += [f'sql{i};dur={elapsed * 1000:.1f}' for i, (elapsed, _) in enumerate(stats['slowest'], 1)]
+        if 'request_start' in g:
+            metrics.append(f'app;dur={(time.perf_counter() - g.request_start) * 1000:.1f}')
+        response.headers.add('Server-Timing', ', '.join(metrics))
+        return response
+
+
+def init_query_budget(app):
+    """
+    Fail requests that exceed the query budget. Enabled when the QUERY_BUDGET
+    setting is set, which is meant for test runs to catch N+1 regressions.
+    """
+    @app.after_request
+    def check_query_budget(response):
+        budget = app.config.get('QUERY_BUDGET')
+        count = g.get('query_count', 0)
+        if budget is not None and count > budget:
+            raise QueryBudgetExceeded(f"{request.endpoint} issued {count} queries, budget is {budget}")
+        return response
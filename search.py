@@ -0,0 +1,141 @@
+import logging
+import re
+
+from sqlalchemy import Table, Column, Integer, String, Float, MetaData, func, literal_column, select, text
+from sqlalchemy.exc import OperationalError
+
+from models import Task, Tag, task_tag_association
+from helper import parse_tag_names
+
+logger = logging.getLogger(__name__)
+
+# The FTS5 index is SQLite specific, so it is kept out of models.Base.metadata
+tasks_fts = Table(
+    'tasks_fts',
+    MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('title', String),
+    Column('description', String),
+    Column('rank', Float),
+)
+
+# External-content FTS5 table over tasks, kept in sync by triggers so every
+# write path (ORM, bulk SQL, scripts) updates the index. Tags are matched
+# exactly through task_tag_association instead (see filter_tasks_by_tags).
+TASK_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description,
+        content='tasks', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+fts_enabled = False  # Set by init_task_search when the index is available
+
+
+def init_task_search(engine):
+    """
+    Create the task full-text index and its triggers if they don't exist yet.
+    Falls back to LIKE searches when the database has no FTS5 support.
+    """
+    global fts_enabled
+
+    if engine.dialect.name != 'sqlite':
+        fts_enabled = False
+        return fts_enabled
+
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+            ).first()
+            for statement in TASK_SEARCH_DDL:
+                connection.execute(text(statement))
+            # Index the tasks that were written before the index existed
+            if not exists:
+                connection.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+        fts_enabled = True
+    except OperationalError:
+        logger.warning("SQLite FTS5 is not available, task search falls back to LIKE")
+        fts_enabled = False
+
+    return fts_enabled
+
+
+def _prefix_terms(value):
+    # Quote every word so user input can't inject FTS5 query syntax
+    return [f'"{word}"*' for word in re.findall(r'\w+', value)]
+
+
+def build_match_expression(name=None):
+    """
+    Translate the show_tasks name field into an FTS5 MATCH expression over
+    titles and descriptions.
+    """
+    name_terms = _prefix_terms(name) if name else []
+    if not name_terms:
+        return ''
+    return '{title description} : (' + ' AND '.join(name_terms) + ')'
+
+
+def search_tasks(query, name=None, ranked=True):
+    """
+    Restrict a Task query to full-text matches, best matches first when ranked.
+    """
+    expression = build_match_expression(name=name)
+    if not expression:
+        return query
+
+    query = query.join(tasks_fts, tasks_fts.c.rowid == Task.id).filter(
+        literal_column('tasks_fts').op('MATCH')(expression)
+    )
+    if ranked:
+        query = query.order_by(tasks_fts.c.rank)
+    return query
+
+
+def filter_tasks_by_tags(query, tags):
+    """
+    Restrict a Task query to tasks carrying every one of the given tags.
+    Each tag resolves through the unique tags.name index and the
+    (tag_id, task_id) index on task_tag_association.
+    """
+    for name in parse_tag_names(tags):
+        tagged_task_ids = select(task_tag_association.c.task_id).join(
+            Tag, Tag.id == task_tag_association.c.tag_id
+        ).where(Tag.name == name)
+        query = query.filter(Task.id.in_(tagged_task_ids))
+    return query
+
+
+def tag_counts(session, limit=None):
+    """
+    Count how many tasks carry each tag, most used tags first.
+    """
+    counts = session.query(Tag.name, func.count(task_tag_association.c.task_id).label('count')).join(
+        task_tag_association, task_tag_association.c.tag_id == Tag.id
+    ).group_by(Tag.id).order_by(func.count(task_tag_association.c.task_id).desc(), Tag.name)
+    if limit is not None:
+        counts = counts.limit(limit)
+    return [{'name': name, 'count': count} for name, count in counts]
@@ -0,0 +1,62 @@
+from sqlalchemy import insert, select
+
+from models import User, Team, TeamMemberRole, team_user_association
+
+
+class UnknownMembers(ValueError):
+    """
+    Raised when a team references user ids that do not exist.
+    """
+
+    def __init__(self, user_ids):
+        super().__init__(f"Unknown user ids: {sorted(user_ids)}")
+        self.user_ids = user_ids
+
+
+def create_teams(session, teams):
+    """
+    Create several teams with their members and roles. Members are looked up
+    once and memberships and roles are written with one multi-row INSERT each,
+    whatever the number of members; only the team rows are inserted one by
+    one, as SQLite cannot return ids in order for a batched insert.
+
+    teams is a list of dicts with 'name', 'description' and 'members', a list
+    of (user_id, role) pairs; a role of None adds no TeamMemberRole. Members
+    listed twice in a team keep their first role. Raises UnknownMembers before
+    writing anything if a user id does not exist. Returns the ids of the new
+    teams, in order. The caller commits.
+    """
+    if not teams:
+        return []
+
+    members_by_team = []
+    for team in teams:
+        members = {}
+        for user_id, role in team['members']:
+            members.setdefault(int(user_id), role)
+        members_by_team.append(members)
+
+    # One lookup for every member of every team
+    requested = set().union(*members_by_team)
+    existing = set(session.execute(select(User.id).where(User.id.in_(requested))).scalars()) if requested else set()
+    if requested - existing:
+        raise UnknownMembers(requested - existing)
+
+    team_ids = session.execute(
+        insert(Team).returning(Team.id, sort_by_parameter_order=True),
+        [{'name': team['name'], 'description': team.get('description')} for team in teams],
+    ).scalars().all()
+
+    memberships = [
+        {'team_id': team_id, 'user_id': user_id}
+        for team_id, members in zip(team_ids, members_by_team) for user_id in members
+    ]
+    roles = [
+        {'team_id': team_id, 'user_id': user_id, 'role': role}
+        for team_id, members in zip(team_ids, members_by_team) for user_id, role in members.items() if role is not None
+    ]
+    if memberships:
+        session.execute(insert(team_user_association).values(memberships))
+    if roles:
+        session.execute(insert(TeamMemberRole).values(roles))
+    return team_ids
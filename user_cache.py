@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import User
+import config
+
+# Changes to these columns evict the user from the cache once committed
+INVALIDATING_COLUMNS = ('password', 'is_active', 'authority')
+
+
+class CachedUser:
+    """
+    The fields of a user needed to authenticate and authorize a request, in
+    place of a full User row. Implements the Flask-Login user interface.
+    """
+    __slots__ = ('id', 'username', 'authority', 'is_active', 'expires')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, authority, is_active, expires):
+        self.id = id
+        self.username = username
+        self.authority = authority
+        self.is_active = is_active
+        self.expires = expires
+
+    def get_id(self):
+        return str(self.id)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id} {self.username!r}>'
+
+
+class UserCache:
+    """
+    Per-process cache of CachedUser records with a time to live, holding at
+    most max_size users (least recently used are evicted first).
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session, user_id):
+        now = time.monotonic()
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None and user.expires > now:
+                self._users.move_to_end(user_id)
+                return user
+
+        row = session.execute(
+            select(User.id, User.username, User.authority, User.is_active).where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(*row, expires=now + self.ttl)
+        with self._lock:
+            self._users[user_id] = user
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(config.USER_CACHE_TTL, config.USER_CACHE_SIZE)
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_changed_users(session, flush_context):
+    # Users whose credentials or permissions changed in this transaction
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[name].history.has_changes() for name in INVALIDATING_COLUMNS):
+            session.info.setdefault('changed_user_ids', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
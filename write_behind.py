@@ -0,0 +1,155 @@
+import atexit
+import logging
+import queue
+import threading
+
+from database import session
+import config
+
+logger = logging.getLogger(__name__)
+
+# Non-critical writes (notification fan-out and the like) queued by request
+# handlers and applied by one background thread, many per transaction, so
+# requests don't wait for the SQLite write lock on their behalf.
+_queue = queue.Queue(maxsize=config.WRITE_BEHIND_CAPACITY)
+_stop_event = threading.Event()
+_worker_thread = None
+_stats_lock = threading.Lock()
+_stats = {
+    'enqueued': 0,
+    'dropped': 0,
+    'processed': 0,
+    'failed': 0,
+    'batches': 0,
+    'max_depth': 0,
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def enqueue(job, *args):
+    """
+    Queue job(*args) to run on the write-behind thread. The job uses the
+    scoped session and must not commit; the thread commits each batch.
+
+    Without a running worker the job is applied immediately. Returns False
+    (and drops the job) when the queue is full.
+    """
+    if _worker_thread is None or not _worker_thread.is_alive():
+        job(*args)
+        session.commit()
+        return True
+
+    try:
+        _queue.put_nowait((job, args))
+    except queue.Full:
+        _count('dropped')
+        logger.warning("Write-behind queue full, dropped %s", getattr(job, '__name__', job))
+        return False
+
+    with _stats_lock:
+        _stats['enqueued'] += 1
+        _stats['max_depth'] = max(_stats['max_depth'], _queue.qsize())
+    return True
+
+
+def queue_depth():
+    return _queue.qsize()
+
+
+def write_behind_stats():
+    """
+    Return the queue depth and the job counters since startup.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['depth'] = _queue.qsize()
+    stats['capacity'] = _queue.maxsize
+    return stats
+
+
+def _apply(batch):
+    """
+    Run a batch of jobs in one transaction. If the batch fails, its jobs are
+    retried in a transaction each so one bad job doesn't lose the others.
+    """
+    try:
+        for job, args in batch:
+            job(*args)
+        session.commit()
+        _count('processed', len(batch))
+    except Exception:
+        session.rollback()
+        if len(batch) > 1:
+            for item in batch:
+                _apply([item])
+        else:
+            logger.exception("Write-behind job %s failed", getattr(batch[0][0], '__name__', batch[0][0]))
+            _count('failed')
+
+
+def _next_batch(timeout):
+    try:
+        batch = [_queue.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+
+    while len(batch) < config.WRITE_BEHIND_BATCH_SIZE:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run_worker():
+    while not _stop_event.is_set():
+        batch = _next_batch(config.WRITE_BEHIND_POLL_SECONDS)
+        if batch:
+            _apply(batch)
+            _count('batches')
+            session.remove()
+
+
+def flush():
+    """
+    Apply every queued job on the calling thread.
+    """
+    while True:
+        batch = _next_batch(0)
+        if not batch:
+            return
+        _apply(batch)
+        _count('batches')
+
+
+def start_write_behind():
+    """
+    Start the write-behind thread. Queued jobs are flushed at shutdown.
+    """
+    global _worker_thread
+
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+
+    _stop_event.clear()
+    _worker_thread = threading.Thread(target=_run_worker, name='write-behind', daemon=True)
+    _worker_thread.start()
+    atexit.register(stop_write_behind)
+    return _worker_thread
+
+
+def stop_write_behind(timeout=10):
+    """
+    Stop the write-behind thread and apply whatever is still queued.
+    """
+    global _worker_thread
+
+    _stop_event.set()
+    if _worker_thread is not None:
+        _worker_thread.join(timeout)
+        _worker_thread = None
+    flush()